@@ -0,0 +1,187 @@
+"""Persistent registry of Azure AI Foundry agents keyed by configuration fingerprint, so one
+agent per configuration is reused across queries and processes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from azure.core.exceptions import ResourceNotFoundError
+
+DEFAULT_REGISTRY_PATH = os.environ.get(
+    "ADF_AGENT_REGISTRY_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".adf_agent_registry.json"),
+)
+RETIRE_AFTER = float(os.environ.get("ADF_AGENT_RETIRE_HOURS", "24")) * 3600
+
+
+def _json_default(obj):
+    as_dict = getattr(obj, "as_dict", None)
+    if callable(as_dict):
+        return as_dict()
+    return str(obj)
+
+
+def agent_fingerprint(model: str, name: str, instructions: str, tools, tool_resources=None) -> str:
+    """Stable sha256 over everything that defines the agent's behaviour.
+
+    Tool definitions are compared as a sorted set: FunctionTool built from a set of
+    functions does not emit them in a stable order across processes.
+    """
+    tool_blobs = sorted(json.dumps(t, sort_keys=True, default=_json_default) for t in (tools or []))
+    blob = json.dumps(
+        {
+            "model": model,
+            "name": name,
+            "instructions": instructions,
+            "tools": tool_blobs,
+            "tool_resources": tool_resources,
+        },
+        sort_keys=True,
+        default=_json_default,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class AgentRegistry:
+    """Maps a configuration fingerprint to a reusable agent id, persisted as JSON.
+
+    Each entry also records its registry key (e.g. 'stadfops'). When a key gets a new
+    configuration, the agents of its older ones are marked superseded and deleted once they
+    have been superseded for retire_after seconds, so processes still running the old
+    configuration keep working in the meantime.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH, retire_after: float = RETIRE_AFTER):
+        self.path = path
+        self.retire_after = retire_after
+        self._lock = threading.Lock()
+        self._validated = set()  # agent ids checked with get_agent() in this process
+        self._configs = {}  # key -> last get_or_create arguments, for recreate()
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if any("fingerprint" in entry for entry in entries.values()):
+            # Older files were keyed by registry key: {key: {"fingerprint", "agent_id", "created_at"}}.
+            entries = {e["fingerprint"]: {"key": k, "agent_id": e["agent_id"], "created_at": e.get("created_at")}
+                       for k, e in entries.items()}
+        return entries
+
+    def _save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._entries, fh, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as ex:
+            # Registry is an optimisation; an unwritable path only costs a create per process.
+            print(f"Agent registry not persisted ({self.path}): {ex}")
+
+    def _retire_superseded(self, agents_client, key: str, log) -> bool:
+        """Delete the agents of key superseded longer than retire_after ago. True if any entry went."""
+        now = time.time()
+        changed = False
+        for fingerprint, entry in list(self._entries.items()):
+            superseded_at = entry.get("superseded_at")
+            if entry.get("key") != key or superseded_at is None or now - superseded_at < self.retire_after:
+                continue
+            try:
+                agents_client.delete_agent(entry["agent_id"])
+                log(f"Deleted superseded agent {entry['agent_id']} (registry key={key})")
+            except ResourceNotFoundError:
+                pass
+            except Exception as ex:
+                log(f"Could not delete superseded agent {entry['agent_id']}: {ex}")
+                continue  # try again next time
+            del self._entries[fingerprint]
+            self._validated.discard(entry["agent_id"])
+            changed = True
+        return changed
+
+    def get_or_create(self, agents_client, key: str, model: str, name: str, instructions: str,
+                      tools, tool_resources=None, log=print) -> str:
+        """Return the id of an agent matching this configuration, creating it only if needed."""
+        fingerprint = agent_fingerprint(model, name, instructions, tools, tool_resources)
+        with self._lock:
+            self._configs[key] = dict(model=model, name=name, instructions=instructions, tools=tools,
+                                      tool_resources=tool_resources)
+            entry = self._entries.get(fingerprint)
+            if entry and entry["agent_id"] in self._validated:
+                log(f"Reusing agent {entry['agent_id']} (registry key={key})")
+                return entry["agent_id"]
+
+            # First use in this process, or a new configuration: pick up other processes' changes.
+            self._entries = self._load()
+            entry = self._entries.get(fingerprint)
+            if entry:
+                agent_id = entry["agent_id"]
+                try:
+                    agents_client.get_agent(agent_id)
+                    self._validated.add(agent_id)
+                    if self._retire_superseded(agents_client, key, log):
+                        self._save()
+                    log(f"Reusing agent {agent_id} (validated, registry key={key})")
+                    return agent_id
+                except ResourceNotFoundError:
+                    log(f"Registered agent {agent_id} no longer exists; recreating")
+
+            agent = agents_client.create_agent(
+                model=model,
+                name=name,
+                instructions=instructions,
+                tools=tools,
+                tool_resources=tool_resources,
+            )
+            now = time.time()
+            for other_fingerprint, other in self._entries.items():
+                if other.get("key") == key and other_fingerprint != fingerprint:
+                    other.setdefault("superseded_at", now)
+            self._entries[fingerprint] = {"key": key, "agent_id": agent.id, "created_at": now}
+            self._validated.add(agent.id)
+            self._retire_superseded(agents_client, key, log)
+            self._save()
+            log(f"Created agent {agent.id} (registry key={key})")
+        return agent.id
+
+    def agent_exists(self, agents_client, agent_id: str) -> bool:
+        """Whether agent_id still exists on the service (tells a deleted agent from a deleted thread)."""
+        try:
+            agents_client.get_agent(agent_id)
+            return True
+        except ResourceNotFoundError:
+            with self._lock:
+                self._validated.discard(agent_id)
+            return False
+
+    def recreate(self, agents_client, key: str, log=print) -> str:
+        """Create the agent of key again (deleted out from under us) with the configuration of the
+        last get_or_create for that key."""
+        with self._lock:
+            config = self._configs.get(key)
+            if config is None:
+                raise KeyError(f"No agent configuration known for registry key {key!r}")
+            entry = self._entries.get(agent_fingerprint(**config))
+            if entry:
+                self._validated.discard(entry["agent_id"])  # make get_or_create check it again
+        return self.get_or_create(agents_client, key, log=log, **config)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    """Return the process-wide registry (loaded from disk on first call)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AgentRegistry()
+    return _registry
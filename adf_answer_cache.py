@@ -0,0 +1,161 @@
+"""Answer cache in front of adf_agent, keyed on the normalized query and checked against the
+state of the runs the answer was built from.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from adf_cache import TERMINAL_STATUSES, run_cache
+from adf_store import get_run_store
+
+ANSWER_CACHE_ENABLED = os.environ.get("ADF_ANSWER_CACHE", "1") != "0"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("Did processELT fail?" == "did processelt fail")."""
+    return " ".join(re.sub(r"[^\w\s-]", " ", (query or "").lower()).split())
+
+
+def _run_pairs(data, pairs) -> None:
+    """Collect (runId, status) pairs from a tool's JSON output (records or column tables)."""
+    if isinstance(data, dict):
+        if "columns" in data and "rows" in data and "runId" in data["columns"]:
+            i, j = data["columns"].index("runId"), data["columns"].index("status")
+            pairs.extend((row[i], row[j]) for row in data["rows"])
+        elif "runId" in data:
+            pairs.append((data.get("runId"), data.get("status")))
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                _run_pairs(value, pairs)
+    elif isinstance(data, list):
+        for item in data:
+            _run_pairs(item, pairs)
+
+
+def output_fingerprint(output):
+    """Fingerprint of one tool output; None for error text (never cache on errors)."""
+    if not isinstance(output, str):
+        return None
+    try:
+        data = json.loads(output)
+    except ValueError:
+        # Plain-text answers like "No runs found for pipeline." are data; anything else is an error.
+        return output if output.startswith("No ") else None
+    pairs = []
+    _run_pairs(data, pairs)
+    if pairs:
+        return sorted(set((str(r), str(s)) for r, s in pairs))
+    # No run ids (e.g. an activity list): any change in the payload counts.
+    return hashlib.sha256(output.encode("utf-8")).hexdigest()
+
+
+def _known_run_status(run_id):
+    status = run_cache.run_status(run_id)
+    if status is None:
+        store = get_run_store()
+        status = store.run_status(run_id) if store is not None else None
+    return status
+
+
+def lookup_check(func_name: str, args: dict, output):
+    """(func_name to replay or None, args, expected fingerprint) for one lookup; None if not cacheable."""
+    expected = output_fingerprint(output)
+    if expected is None:
+        return None
+    if func_name == "adf_pipeline_activity_runs":
+        run_id = args.get("pipeline_run_id")
+        return (None, args, expected) if _known_run_status(run_id) in TERMINAL_STATUSES else None
+    if func_name == "adf_pipeline_run_details":
+        latest_args = {"pipelinename": args.get("pipelinename", "processELT"), "status": args.get("status")}
+        try:
+            run = json.loads(output).get("run")
+        except (ValueError, AttributeError):
+            return ("adf_pipeline_runs", latest_args, expected)  # "No runs found ..." text
+        if not isinstance(run, dict) or run.get("status") not in TERMINAL_STATUSES:
+            return None
+        return ("adf_pipeline_runs", latest_args, output_fingerprint(json.dumps(run)))
+    return (func_name, args, expected)
+
+
+class AnswerCache:
+    """Thread-safe LRU of normalized query -> (checks, result, stored_at)."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, query: str, dispatch: dict, log=print):
+        """Cached result for query if its data fingerprint still matches, else None."""
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry["stored_at"] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+        # Replay the status lookups outside the lock; they are cached / store-backed and cheap.
+        changed = False
+        for func_name, args, expected in entry["checks"]:
+            if func_name is None:
+                continue  # activities of a terminal run
+            fn = dispatch.get(func_name)
+            if fn is None or output_fingerprint(fn(args)) != expected:
+                changed = True
+                break
+        if changed:
+            with self._lock:
+                self._entries.pop(key, None)
+                self.stale += 1
+            log(f"Answer cache: data changed for '{key}'")
+            return None
+        with self._lock:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        result = dict(entry["result"])
+        result["details"] = f"Answer cache hit (data fingerprint unchanged)\n{result.get('details', '')}"
+        result["token_usage"] = None
+        result["cached"] = True
+        return result
+
+    def put(self, query: str, outputs, result: dict) -> bool:
+        """Cache result; outputs are the run's [(func_name, args, output), ...]. False if not cacheable."""
+        checks = []
+        for func_name, args, output in outputs:
+            check = lookup_check(func_name, args or {}, output)
+            if check is None:
+                return False
+            checks.append(check)
+        if not checks:
+            return False  # no ADF lookups to check it against later (docs, clarifying questions)
+        key = normalize_query(query)
+        entry = {
+            "checks": checks,
+            "result": dict(result, thread_id=None),
+            "stored_at": time.monotonic(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale, "size": len(self._entries)}
+
+
+answer_cache = AnswerCache(
+    max_entries=int(os.environ.get("ADF_ANSWER_CACHE_MAX", "256")),
+    ttl=float(os.environ.get("ADF_ANSWER_CACHE_TTL", "3600")),
+)
@@ -0,0 +1,120 @@
+"""Process-wide Azure AD token provider shared by the ADF helpers: one credential, tokens
+cached per scope and refreshed ahead of expiry.
+"""
+
+import threading
+import time
+
+from azure.identity import DefaultAzureCredential
+
+ARM_SCOPE = "https://management.azure.com/.default"
+
+
+class TokenProvider:
+    """Caches access tokens per scope on top of a single shared credential."""
+
+    def __init__(self, credential=None, refresh_margin: float = 300.0, min_validity: float = 60.0):
+        """
+        refresh_margin: seconds before expiry at which a background refresh is started.
+        min_validity: below this many seconds of remaining lifetime the token is refreshed
+                      synchronously instead of being handed out.
+        """
+        self._credential = credential
+        self.refresh_margin = refresh_margin
+        self.min_validity = min_validity
+        self._lock = threading.Lock()
+        self._tokens = {}        # scope -> azure.core.credentials.AccessToken
+        self._fetch_locks = {}   # scope -> Lock serialising synchronous fetches
+        self._refreshing = set() # scopes with a background refresh in flight
+
+    @property
+    def credential(self):
+        """The shared credential (created lazily on first use)."""
+        if self._credential is None:
+            with self._lock:
+                if self._credential is None:
+                    self._credential = DefaultAzureCredential()
+        return self._credential
+
+    def get_token(self, scope: str = ARM_SCOPE) -> str:
+        """Return a bearer token string for scope. Raises the credential's error on failure."""
+        now = time.time()
+        with self._lock:
+            cached = self._tokens.get(scope)
+        if cached is not None:
+            remaining = cached.expires_on - now
+            if remaining > self.refresh_margin:
+                return cached.token
+            if remaining > self.min_validity:
+                self._refresh_in_background(scope)
+                return cached.token
+        return self._fetch(scope)
+
+    def invalidate(self, scope: str = ARM_SCOPE) -> None:
+        """Drop the cached token for scope (e.g. after a 401) so the next call re-authenticates."""
+        with self._lock:
+            self._tokens.pop(scope, None)
+
+    def _fetch_lock(self, scope: str) -> threading.Lock:
+        with self._lock:
+            lock = self._fetch_locks.get(scope)
+            if lock is None:
+                lock = self._fetch_locks[scope] = threading.Lock()
+            return lock
+
+    def _fetch(self, scope: str) -> str:
+        with self._fetch_lock(scope):
+            # Another thread may have filled the cache while we waited for the lock.
+            with self._lock:
+                cached = self._tokens.get(scope)
+            if cached is not None and cached.expires_on - time.time() > self.min_validity:
+                return cached.token
+            token = self.credential.get_token(scope)
+            with self._lock:
+                self._tokens[scope] = token
+            return token.token
+
+    def _refresh_in_background(self, scope: str) -> None:
+        with self._lock:
+            if scope in self._refreshing:
+                return
+            self._refreshing.add(scope)
+
+        def _worker():
+            try:
+                with self._fetch_lock(scope):
+                    token = self.credential.get_token(scope)
+                with self._lock:
+                    self._tokens[scope] = token
+            except Exception as ex:
+                # Keep serving the current token; the next call past min_validity retries synchronously.
+                print(f"Background token refresh failed for {scope}: {ex}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(scope)
+
+        threading.Thread(target=_worker, name="adf-token-refresh", daemon=True).start()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_token_provider() -> TokenProvider:
+    """Return the process-wide TokenProvider (created on first call)."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = TokenProvider()
+    return _provider
+
+
+def get_credential():
+    """Return the shared credential so SDK clients reuse the same credential chain."""
+    return get_token_provider().credential
+
+
+def get_arm_token() -> str:
+    """Return a cached management.azure.com bearer token."""
+    return get_token_provider().get_token(ARM_SCOPE)
@@ -0,0 +1,649 @@
+"""Offline benchmark of stadfops.adf_agent against scripted fake Agents and ARM backends (see --help)."""
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+# Service latencies in seconds (scaled by --latency-scale).
+LATENCY_PROFILE = {
+    "create_agent": 0.8,
+    "get_agent": 0.05,
+    "threads.create": 0.12,
+    "messages.create": 0.1,
+    "runs.create": 0.15,
+    "runs.get": 0.06,
+    "submit_tool_outputs": 0.1,
+    "run_steps.list": 0.12,
+    "messages.list": 0.1,
+    "queue": 0.3,        # queued -> in_progress
+    "model_turn": 1.2,   # in_progress -> requires_action / completed
+    "arm": 0.25,         # per ARM HTTP request
+}
+TERMINAL = ("completed", "failed", "cancelled", "expired")
+ARM_PAGE_SIZE = 100
+
+
+def run_id_for(pipeline: str, index: int = 0) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"adf-bench/{pipeline}/{index}"))
+
+
+# Scenario -> (query template, turns); each turn is a batch of (function, args) calls.
+SCENARIOS = {
+    "status": ("What is the status of the last run of {p}?", lambda p: [
+        [("adf_pipeline_runs", {"pipelinename": p})],
+    ]),
+    "failure_details": ("Which activity failed in the last failed run of {p}?", lambda p: [
+        [("adf_pipeline_run_details", {"pipelinename": p, "status": "Failed"})],
+    ]),
+    "fan_out": ("How did {p}_a, {p}_b and {p}_c do?", lambda p: [
+        [("adf_pipeline_runs", {"pipelinename": f"{p}_{s}"}) for s in "abc"],
+    ]),
+    "drill_in": ("Show the activities of the latest run of {p}", lambda p: [
+        [("adf_pipeline_runs", {"pipelinename": p})],
+        [("adf_pipeline_activity_runs", {"pipeline_run_id": run_id_for(p)})],
+    ]),
+}
+
+
+class Latency:
+    def __init__(self, scale: float = 1.0, profile: dict = None):
+        self.scale = scale
+        self.profile = dict(LATENCY_PROFILE, **(profile or {}))
+
+    def seconds(self, key: str) -> float:
+        return self.profile.get(key, 0.0) * self.scale
+
+    def sleep(self, key: str) -> None:
+        delay = self.seconds(key)
+        if delay > 0:
+            time.sleep(delay)
+
+
+# ---------------------------------------------------------------- fake ARM backend
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+        self.headers = {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeArmSession:
+    """Stands in for AdfRestClient.session; serves run queries from stadfops_demo mock data."""
+
+    def __init__(self, latency: Latency, activities_per_run: int = 2):
+        from stadfops_demo import adf_pipeline_activity_runs, adf_pipeline_runs
+        self.latency = latency
+        self.activities_per_run = activities_per_run
+        self._demo_runs = adf_pipeline_runs
+        self._demo_activities = adf_pipeline_activity_runs
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def request(self, method, url, headers=None, json=None, timeout=None):
+        self.latency.sleep("arm")
+        with self._lock:
+            self.requests += 1
+        path = urlparse(url).path
+        payload = json or {}
+        if path.endswith("/queryPipelineRuns"):
+            records = self._pipeline_runs(payload)
+        elif path.endswith("/queryActivityRuns"):
+            records = self._activity_runs(path.rstrip("/").split("/")[-2])
+        else:
+            return FakeResponse(404, {"error": {"code": "NotFound", "message": path}})
+        return FakeResponse(200, self._page(records, payload))
+
+    @staticmethod
+    def _page(records, payload) -> dict:
+        offset = int(payload.get("continuationToken") or 0)
+        body = {"value": records[offset:offset + ARM_PAGE_SIZE]}
+        if offset + ARM_PAGE_SIZE < len(records):
+            body["continuationToken"] = str(offset + ARM_PAGE_SIZE)
+        return body
+
+    def _runs_of(self, pipeline: str) -> list:
+        # Latest run as in the demo mock (Failed for "*failed*" names), then an older failure.
+        latest = json.loads(self._demo_runs(pipeline))
+        now = time.time()
+        runs = []
+        for index, status in enumerate((latest["status"], "Failed")):
+            start = now - 3600 * (index + 1)
+            runs.append(dict(
+                latest,
+                runId=run_id_for(pipeline, index),
+                status=status,
+                runStart=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+                runEnd=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + 900)),
+                lastUpdated=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + 900)),
+                durationInMs=900000,
+            ))
+        return runs
+
+    def _pipeline_runs(self, payload: dict) -> list:
+        names, statuses = None, None
+        for f in payload.get("filters") or []:
+            if f.get("operand") == "PipelineName":
+                names = f.get("values")
+            elif f.get("operand") == "Status":
+                statuses = f.get("values")
+        runs = [r for name in (names or ["bench_default"]) for r in self._runs_of(name)]
+        if statuses:
+            runs = [r for r in runs if r["status"] in statuses]
+        return sorted(runs, key=lambda r: r["runStart"], reverse=True)
+
+    def _activity_runs(self, pipeline_run_id: str) -> list:
+        template = json.loads(self._demo_activities(pipeline_run_id))
+        records = []
+        for i in range(self.activities_per_run):
+            base = template[i % len(template)]
+            failed = i == self.activities_per_run - 1 and base.get("status") == "Failed"
+            records.append(dict(
+                base,
+                activityName=base["activityName"] if i < len(template) else f"{base['activityName']}_{i}",
+                activityRunId=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{pipeline_run_id}/{i}")),
+                pipelineRunId=pipeline_run_id,
+                status="Failed" if failed else "Succeeded",
+                durationInMs=1000 + 37 * i,
+                error=base.get("error") if failed else {"errorCode": "", "message": "", "failureType": "", "target": ""},
+            ))
+        return records
+
+
+class _FakeTokens:
+    def get_token(self, scope):
+        return "bench-token"
+
+    def invalidate(self, scope):
+        pass
+
+
+def fake_adf_client(latency: Latency, activities_per_run: int = 2):
+    from adf_rest import AdfRestClient
+    client = AdfRestClient("00000000-0000-0000-0000-000000000000", "bench-rg", "bench-factory",
+                           token_provider=_FakeTokens())
+    client.session = FakeArmSession(latency, activities_per_run)
+    return client
+
+
+# ---------------------------------------------------------------- fake Agents service
+
+class _FakeRun:
+    def __init__(self, run_id, thread_id, agent_id, turns, latency: Latency):
+        self.id = run_id
+        self.thread_id = thread_id
+        self.agent_id = agent_id
+        self.turns = turns
+        self.turn = 0
+        self.status = "queued"
+        self.ready_at = time.monotonic() + latency.seconds("queue")
+        self.steps = []
+        self.pending_calls = []
+
+    def snapshot(self):
+        from azure.ai.agents.models import (RequiredFunctionToolCall, RequiredFunctionToolCallDetails,
+                                            SubmitToolOutputsAction, SubmitToolOutputsDetails, ThreadRun)
+        run = ThreadRun({"id": self.id, "object": "thread.run", "status": self.status,
+                         "thread_id": self.thread_id, "agent_id": self.agent_id})
+        if self.status == "requires_action":
+            run.required_action = SubmitToolOutputsAction(submit_tool_outputs=SubmitToolOutputsDetails(tool_calls=[
+                RequiredFunctionToolCall(id=call_id, function=RequiredFunctionToolCallDetails(name=name, arguments=json.dumps(args)))
+                for call_id, name, args in self.pending_calls
+            ]))
+        if self.status == "completed":
+            prompt = 900 + 600 * len(self.turns)
+            run.usage = {"prompt_tokens": prompt, "completion_tokens": 180, "total_tokens": prompt + 180}
+        return run
+
+
+class _Stream:
+    def __init__(self, events):
+        self._events = events
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        return self._events
+
+
+class FakeAgentsClient:
+    """Scripted stand-in for project_client.agents (see module docstring)."""
+
+    def __init__(self, latency: Latency, scripts: dict, streaming: bool = True):
+        self.latency = latency
+        self.scripts = scripts  # user message -> turns
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self._messages = {}
+        self._runs = {}
+        self.threads = SimpleNamespace(create=self._create_thread, get=self._get_thread)
+        self.messages = SimpleNamespace(create=self._create_message, list=self._list_messages)
+        self.run_steps = SimpleNamespace(list=self._list_steps)
+        self.runs = SimpleNamespace(create=self._create_run, get=self._get_run, cancel=self._cancel_run,
+                             submit_tool_outputs=self._submit, submit_tool_outputs_stream=self._submit_stream)
+        if streaming:
+            self.runs.stream = self._stream
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    # agents
+    def create_agent(self, **kwargs):
+        self.latency.sleep("create_agent")
+        return SimpleNamespace(id=self._new_id("asst"))
+
+    def get_agent(self, agent_id):
+        self.latency.sleep("get_agent")
+        return SimpleNamespace(id=agent_id)
+
+    def delete_agent(self, agent_id):
+        pass
+
+    # threads / messages
+    def _create_thread(self, **kwargs):
+        self.latency.sleep("threads.create")
+        thread_id = self._new_id("thread")
+        with self._lock:
+            self._messages[thread_id] = []
+        return SimpleNamespace(id=thread_id)
+
+    def _get_thread(self, thread_id):
+        if thread_id not in self._messages:
+            raise KeyError(thread_id)
+        return SimpleNamespace(id=thread_id)
+
+    def _create_message(self, thread_id, role, content, **kwargs):
+        self.latency.sleep("messages.create")
+        message = SimpleNamespace(role=role, text_messages=[SimpleNamespace(text=SimpleNamespace(value=content))])
+        with self._lock:
+            self._messages.setdefault(thread_id, []).append(message)
+        return message
+
+    def _list_messages(self, thread_id, order=None, limit=None, **kwargs):
+        self.latency.sleep("messages.list")
+        with self._lock:
+            messages = list(self._messages.get(thread_id, []))
+        if str(getattr(order, "value", order) or "").lower().startswith("desc"):
+            messages.reverse()
+        return messages[:limit] if limit else messages
+
+    # runs
+    def _create_run(self, thread_id, agent_id, **kwargs):
+        self.latency.sleep("runs.create")
+        with self._lock:
+            question = next((m.text_messages[-1].text.value for m in reversed(self._messages.get(thread_id, []))
+                             if m.role == "user"), "")
+            run = _FakeRun(self._new_id("run"), thread_id, agent_id, self.scripts.get(question, []), self.latency)
+            self._runs[run.id] = run
+        return run
+
+    def _advance(self, run: _FakeRun) -> None:
+        now = time.monotonic()
+        if run.status == "queued" and now >= run.ready_at:
+            run.status = "in_progress"
+            run.ready_at = now + self.latency.seconds("model_turn")
+        if run.status == "in_progress" and now >= run.ready_at:
+            if run.turn < len(run.turns):
+                run.status = "requires_action"
+                run.pending_calls = [(self._new_id("call"), name, args) for name, args in run.turns[run.turn]]
+            else:
+                run.status = "completed"
+                answer = f"Bench answer after {len(run.turns)} tool turns."
+                with self._lock:
+                    self._messages[run.thread_id].append(SimpleNamespace(
+                        role="assistant", text_messages=[SimpleNamespace(text=SimpleNamespace(value=answer))]))
+
+    def _get_run(self, thread_id, run_id, **kwargs):
+        self.latency.sleep("runs.get")
+        run = self._runs[run_id]
+        self._advance(run)
+        return run.snapshot()
+
+    def _cancel_run(self, thread_id, run_id, **kwargs):
+        self._runs[run_id].status = "cancelled"
+
+    def _submit(self, thread_id, run_id, tool_outputs=None, tool_approvals=None, **kwargs):
+        self.latency.sleep("submit_tool_outputs")
+        run = self._runs[run_id]
+        outputs = {o["tool_call_id"]: o["output"] for o in tool_outputs or []}
+        run.steps.append({
+            "id": f"step_{run.id}_{run.turn}",
+            "status": "completed",
+            "step_details": {"tool_calls": [
+                {"id": call_id, "type": "function", "name": name, "arguments": json.dumps(args),
+                 "output": outputs.get(call_id)}
+                for call_id, name, args in run.pending_calls
+            ]},
+        })
+        run.pending_calls = []
+        run.turn += 1
+        run.status = "in_progress"
+        run.ready_at = time.monotonic() + self.latency.seconds("model_turn")
+
+    def _submit_stream(self, thread_id, run_id, event_handler=None, **action):
+        # The same event stream continues after the submission (as with the SDK's handler).
+        self._submit(thread_id, run_id, **action)
+
+    def _events(self, run: _FakeRun):
+        from azure.ai.agents.models import MessageDeltaChunk
+        yield "thread.run.created", run.snapshot(), None
+        while run.status not in TERMINAL:
+            if run.status == "requires_action":
+                yield "thread.run.requires_action", run.snapshot(), None
+                if run.status == "requires_action":  # nothing submitted: the caller cancels
+                    return
+                yield "thread.run.in_progress", run.snapshot(), None
+                continue
+            delay = run.ready_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            before = run.status
+            self._advance(run)
+            if run.status == "completed":
+                answer = self._messages[run.thread_id][-1].text_messages[-1].text.value
+                yield "thread.message.delta", MessageDeltaChunk({
+                    "id": "msg", "object": "thread.message.delta",
+                    "delta": {"role": "assistant", "content": [{"index": 0, "type": "text", "text": {"value": answer}}]},
+                }), None
+            if run.status != before and run.status != "requires_action":
+                yield f"thread.run.{run.status}", run.snapshot(), None
+
+    def _stream(self, thread_id, agent_id, **kwargs):
+        return _Stream(self._events(self._create_run(thread_id, agent_id, **kwargs)))
+
+    def _list_steps(self, thread_id, run_id, **kwargs):
+        self.latency.sleep("run_steps.list")
+        return list(self._runs[run_id].steps)
+
+
+class FakeProject:
+    def __init__(self, agents):
+        self.agents = agents
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+# ---------------------------------------------------------------- harness
+
+class _NullWriter:
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def _prepare_environment(args) -> None:
+    defaults = {
+        "PROJECT_ENDPOINT": "https://bench.services.ai.azure.com/api/projects/bench",
+        "MODEL_ENDPOINT": "https://bench.openai.azure.com",
+        "MODEL_API_KEY": "bench",
+        "MODEL_DEPLOYMENT_NAME": "bench-model",
+        "AZURE_OPENAI_ENDPOINT": "https://bench.openai.azure.com",
+        "AZURE_OPENAI_KEY": "bench",
+        "AZURE_SUBSCRIPTION_ID": "00000000-0000-0000-0000-000000000000",
+        "AZURE_RESOURCE_GROUP": "bench-rg",
+        "AZURE_DATA_FACTORY_NAME": "bench-factory",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+    # Settings read at import time by the modules under test.
+    os.environ["ADF_ROUTER"] = "1" if args.router else "0"
+    os.environ["ADF_ANSWER_CACHE"] = "1" if args.answer_cache else "0"
+    os.environ["ADF_RUN_STREAMING"] = "1" if args.mode == "stream" else "0"
+    os.environ["ADF_AGENT_REGISTRY_PATH"] = os.path.join(tempfile.mkdtemp(prefix="adf_bench_"), "registry.json")
+    os.environ.pop("ADF_RUN_STORE_PATH", None)
+    os.environ.pop("ADF_METRICS_PORT", None)
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _summary(values_ms) -> dict:
+    return {
+        "count": len(values_ms),
+        "p50_ms": round(_percentile(values_ms, 50), 2),
+        "p95_ms": round(_percentile(values_ms, 95), 2),
+        "max_ms": round(max(values_ms), 2) if values_ms else 0.0,
+        "mean_ms": round(statistics.fmean(values_ms), 2) if values_ms else 0.0,
+    }
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.latency = Latency(args.latency_scale)
+        self.scripts = {}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+
+    def setup(self):
+        import adf_rest
+        import stadfops
+        self.stadfops = stadfops
+        self.agents = FakeAgentsClient(self.latency, self.scripts, streaming=self.args.mode == "stream")
+        stadfops.project_client = FakeProject(self.agents)
+        adf_rest._client = fake_adf_client(self.latency, self.args.activities)
+        self.arm = adf_rest._client.session
+
+    def make_query(self, scenario: str, session: int) -> str:
+        """A query of the scenario, with its script registered. Fresh pipeline names unless --warm-cache."""
+        template, turns = SCENARIOS[scenario]
+        with self._lock:
+            pipeline = f"bench_{scenario}_s{session}" if self.args.warm_cache else f"bench_{scenario}_{next(self._ids)}"
+            query = template.format(p=pipeline)
+            self.scripts[query] = turns(pipeline)
+        return query
+
+    def run_query(self, query: str) -> dict:
+        started = time.perf_counter()
+        result = self.stadfops.adf_agent(query)
+        status = result.get("status")
+        return {"latency_ms": (time.perf_counter() - started) * 1000, "status": str(getattr(status, "value", status)),
+                "timings": result.get("timings") or {}}
+
+    def warm_up(self) -> float:
+        """First query: creates the agent in the registry. Returns its latency (ms)."""
+        return self.run_query(self.make_query("status", 0))["latency_ms"]
+
+    def sequential(self) -> dict:
+        per_scenario = {}
+        phases = {}
+        for scenario in self.args.scenarios:
+            latencies = []
+            for _ in range(self.args.queries):
+                sample = self.run_query(self.make_query(scenario, 0))
+                latencies.append(sample["latency_ms"])
+                for span in sample["timings"].get("spans", []):
+                    phases.setdefault(span["name"], []).append(span["duration_ms"])
+            per_scenario[scenario] = _summary(latencies)
+        return {"scenarios": per_scenario, "phases": {name: _summary(v) for name, v in sorted(phases.items())}}
+
+    def concurrent(self, sessions: int) -> dict:
+        latencies = []
+        failures = 0
+
+        def _session(index):
+            out = []
+            for i in range(self.args.queries):
+                scenario = self.args.scenarios[(index + i) % len(self.args.scenarios)]
+                out.append(self.run_query(self.make_query(scenario, index)))
+            return out
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            for samples in pool.map(_session, range(sessions)):
+                for sample in samples:
+                    latencies.append(sample["latency_ms"])
+                    failures += sample["status"] != "completed"
+        wall = time.perf_counter() - started
+        return dict(_summary(latencies), sessions=sessions, wall_s=round(wall, 3),
+                    queries_per_s=round(len(latencies) / wall, 3) if wall else 0.0, failures=failures)
+
+    def allocations(self) -> dict:
+        queries = [self.make_query(self.args.scenarios[i % len(self.args.scenarios)], 0)
+                   for i in range(self.args.alloc_queries)]
+        tracemalloc.start(10)
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base_current, _ = tracemalloc.get_traced_memory()
+        for query in queries:
+            self.run_query(query)
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        allocated = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+        top = [{"site": str(stat.traceback), "kib": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+               for stat in diff[:self.args.top]]
+        n = max(1, len(queries))
+        return {
+            "queries": len(queries),
+            "retained_kib_per_query": round(allocated / 1024 / n, 1),
+            "net_growth_kib": round((current - base_current) / 1024, 1),
+            "peak_kib": round((peak - base_current) / 1024, 1),
+            "top_sites": top,
+        }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Human-readable regressions of report against baseline (empty list = OK)."""
+    regressions = []
+    old_config = baseline.get("config", {})
+    for key in ("mode", "latency_scale", "activities", "warm_cache"):
+        if key in old_config and old_config[key] != report["config"][key]:
+            regressions.append(f"config {key} differs from the baseline ({old_config[key]} vs {report['config'][key]}); "
+                               "numbers are not comparable")
+
+    def _check(label, new, old, higher_is_worse=True):
+        if not old:
+            return
+        change = (new - old) / old
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            regressions.append(f"{label}: {old} -> {new} ({change:+.0%})")
+
+    for scenario, stats in report["sequential"]["scenarios"].items():
+        old = baseline.get("sequential", {}).get("scenarios", {}).get(scenario)
+        if old:
+            _check(f"{scenario} p95_ms", stats["p95_ms"], old["p95_ms"])
+    old_levels = {c["sessions"]: c for c in baseline.get("concurrency", [])}
+    for level in report["concurrency"]:
+        old = old_levels.get(level["sessions"])
+        if old:
+            _check(f"{level['sessions']} sessions queries_per_s", level["queries_per_s"], old["queries_per_s"], False)
+            _check(f"{level['sessions']} sessions p95_ms", level["p95_ms"], old["p95_ms"])
+    if report.get("allocations") and baseline.get("allocations"):
+        _check("retained_kib_per_query", report["allocations"]["retained_kib_per_query"],
+               baseline["allocations"]["retained_kib_per_query"])
+        _check("peak_kib", report["allocations"]["peak_kib"], baseline["allocations"]["peak_kib"])
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    cfg = report["config"]
+    print(f"adf_agent offline benchmark (mode={cfg['mode']}, latency x{cfg['latency_scale']}, "
+          f"{cfg['queries']} queries/scenario, {cfg['activities']} activities/run)")
+    print(f"first query (agent created): {report['first_query_ms']:.1f} ms\n")
+    print(f"{'scenario':<18}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, s in report["sequential"]["scenarios"].items():
+        print(f"{name:<18}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    print(f"\n{'phase':<28}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for name, s in report["sequential"]["phases"].items():
+        print(f"{name:<28}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    print(f"\n{'sessions':<10}{'queries/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'wall s':>9}{'failed':>8}")
+    for c in report["concurrency"]:
+        print(f"{c['sessions']:<10}{c['queries_per_s']:>11.2f}{c['p50_ms']:>10.1f}{c['p95_ms']:>10.1f}"
+              f"{c['wall_s']:>9.2f}{c['failures']:>8}")
+    alloc = report.get("allocations")
+    if alloc:
+        print(f"\nallocations over {alloc['queries']} queries: {alloc['retained_kib_per_query']} KiB retained/query, "
+              f"peak {alloc['peak_kib']} KiB, net growth {alloc['net_growth_kib']} KiB")
+        for site in alloc["top_sites"]:
+            print(f"  {site['kib']:>9.1f} KiB {site['count']:>7}  {site['site']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline adf_agent benchmark (fake Agents service + fake ARM)")
+    parser.add_argument("--mode", choices=("stream", "poll"), default="stream", help="run driver path to exercise")
+    parser.add_argument("--latency-scale", type=float, default=0.2, help="multiplier for the fake service latencies")
+    parser.add_argument("--queries", type=int, default=5, help="queries per scenario (sequential) / per session")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8], help="concurrency levels")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--activities", type=int, default=2, help="activity runs per pipeline run (ForEach size)")
+    parser.add_argument("--alloc-queries", type=int, default=10, help="queries measured with tracemalloc (0 = skip)")
+    parser.add_argument("--top", type=int, default=8, help="allocation sites to report")
+    parser.add_argument("--warm-cache", action="store_true", help="reuse pipeline names so the run cache is hit")
+    parser.add_argument("--router", action="store_true", help="enable the intent router (ADF_ROUTER)")
+    parser.add_argument("--answer-cache", action="store_true", help="enable the answer cache (ADF_ANSWER_CACHE)")
+    parser.add_argument("--json", help="write the report as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression vs the baseline")
+    args = parser.parse_args(argv)
+
+    _prepare_environment(args)
+    bench = Bench(args)
+    quiet = contextlib.redirect_stdout(_NullWriter())  # adf_agent logs every step to stdout
+    with quiet:
+        bench.setup()
+        first = bench.warm_up()
+        sequential = bench.sequential()
+        concurrency = [bench.concurrent(n) for n in args.sessions]
+        allocations = bench.allocations() if args.alloc_queries else None
+    report = {
+        "config": {"mode": args.mode, "latency_scale": args.latency_scale, "queries": args.queries,
+                   "activities": args.activities, "scenarios": args.scenarios, "warm_cache": args.warm_cache,
+                   "python": sys.version.split()[0]},
+        "first_query_ms": round(first, 2),
+        "sequential": sequential,
+        "concurrency": concurrency,
+        "allocations": allocations,
+        "arm_requests": bench.arm.requests,
+    }
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS (> {args.tolerance:.0%} vs {args.baseline}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
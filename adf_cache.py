@@ -0,0 +1,160 @@
+"""In-process caches in front of the ADF lookups: RunCache, an LRU whose TTLs follow the run
+status, and SingleFlight, which lets identical concurrent ARM requests share one call.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TERMINAL_STATUSES = {"Succeeded", "Failed", "Cancelled"}
+
+
+class RunCache:
+    """Thread-safe LRU cache with optional per-entry expiry (ttl=None -> until evicted)."""
+
+    def __init__(self, max_entries: int = 512, active_ttl: float = 10.0, latest_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.active_ttl = active_ttl
+        self.latest_ttl = latest_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._run_status = {}          # runId -> last seen pipeline run status
+        self._latest_run_id = {}       # (pipeline, status filter) -> runId of the last "latest run" answer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached value or None (expired entries count as misses)."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl=None) -> None:
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def note_run_status(self, run_id: str, status: str) -> None:
+        """Remember a pipeline run's status so its activity runs get the right TTL."""
+        if not run_id or not status:
+            return
+        with self._lock:
+            self._run_status[run_id] = status
+            if len(self._run_status) > self.max_entries * 4:
+                # Plain dict keeps insertion order: drop the oldest quarter.
+                for stale in list(self._run_status)[: self.max_entries]:
+                    del self._run_status[stale]
+
+    def note_latest_run(self, pipeline_name: str, status_filter: str, run_id: str) -> None:
+        """Remember which run a "latest run" lookup returned (used to prefetch its activities)."""
+        if not run_id:
+            return
+        with self._lock:
+            self._latest_run_id[(pipeline_name, status_filter or "")] = run_id
+            if len(self._latest_run_id) > self.max_entries:
+                del self._latest_run_id[next(iter(self._latest_run_id))]
+
+    def latest_run_id(self, pipeline_name: str, status_filter: str = ""):
+        with self._lock:
+            return self._latest_run_id.get((pipeline_name, status_filter or ""))
+
+    def run_status(self, run_id: str):
+        with self._lock:
+            return self._run_status.get(run_id)
+
+    def latest_run_ttl(self, status: str) -> float:
+        return self.latest_ttl if status in TERMINAL_STATUSES else self.active_ttl
+
+    def activity_runs_ttl(self, run_id: str):
+        return None if self.run_status(run_id) in TERMINAL_STATUSES else self.active_ttl
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._run_status.clear()
+            self._latest_run_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """Run fn once per key at a time; concurrent callers with the same key share the result."""
+
+    class _Call:
+        __slots__ = ("done", "result", "error")
+
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = self._Call()
+                self.leaders += 1
+                leader = True
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as ex:
+            call.error = ex
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+run_cache = RunCache(
+    max_entries=int(os.environ.get("ADF_CACHE_MAX_ENTRIES", "512")),
+    active_ttl=float(os.environ.get("ADF_CACHE_ACTIVE_TTL", "10")),
+    latest_ttl=float(os.environ.get("ADF_CACHE_LATEST_TTL", "60")),
+)
+
+
+def cache_stats() -> dict:
+    """Hit / miss counters of the shared run cache."""
+    return run_cache.stats()
@@ -0,0 +1,64 @@
+"""Compact, token-budgeted encoding of tool outputs sent to the model."""
+
+import json
+import os
+from collections import Counter
+
+from adf_queries import table_payload
+
+TOKEN_BUDGET = int(os.environ.get("ADF_TOOL_OUTPUT_TOKENS", "4000"))
+TOP_LONGEST = 10
+MAX_FAILED = 50
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def dumps_compact(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _clean(record: dict) -> dict:
+    # Succeeded activities carry {"errorCode": "", "message": "", ...}: pure noise.
+    error = record.get("error")
+    if isinstance(error, dict) and not (error.get("errorCode") or error.get("message")):
+        return dict(record, error=None)
+    return record
+
+
+def encode_table(records, columns) -> str:
+    return dumps_compact(table_payload([_clean(r) for r in records], columns))
+
+
+def aggregate_activity_runs(records, columns, drill_in: str, max_failed: int = MAX_FAILED) -> dict:
+    failed = [_clean(r) for r in records if r.get("status") == "Failed"]
+    longest = sorted(records, key=lambda r: r.get("durationInMs") or 0, reverse=True)[:TOP_LONGEST]
+    return {
+        "view": "aggregate",
+        "total": len(records),
+        "by_status": dict(Counter(r.get("status") for r in records)),
+        "by_type": dict(Counter(r.get("activityType") for r in records)),
+        "failed": table_payload(failed[:max_failed], columns),
+        "failed_shown": min(len(failed), max_failed),
+        "longest": table_payload(longest, ["activityName", "activityType", "status", "durationInMs"]),
+        "drill_in": drill_in,
+    }
+
+
+def encode_activity_runs(records, columns, pipeline_run_id: str, budget: int = TOKEN_BUDGET) -> str:
+    """Compact table of activity runs, or the aggregate view if the table exceeds the budget."""
+    text = encode_table(records, columns)
+    if estimate_tokens(text) <= budget:
+        return text
+    drill_in = (
+        f"{len(records)} activity runs exceed the output budget. For details call "
+        f"adf_pipeline_activity_runs(pipeline_run_id=\"{pipeline_run_id}\") with status=..., "
+        f"activity_name=... (glob) and/or offset=... / limit=..."
+    )
+    max_failed = MAX_FAILED
+    while True:
+        text = dumps_compact(aggregate_activity_runs(records, columns, drill_in, max_failed))
+        if estimate_tokens(text) <= budget or max_failed == 0:
+            return text
+        max_failed //= 2
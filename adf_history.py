@@ -0,0 +1,164 @@
+"""Memory-bounded per-session answer history for the Streamlit UIs (stadf.py, stadfops.py)."""
+
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+
+from adf_cache import RunCache
+
+HISTORY_KEEP = int(os.environ.get("ADF_HISTORY_KEEP", "5"))
+HISTORY_DIR = os.environ.get("ADF_HISTORY_DIR", os.path.join(tempfile.gettempdir(), "adf_history"))
+HISTORY_MAX_AGE = float(os.environ.get("ADF_HISTORY_MAX_AGE", "24")) * 3600
+SUMMARY_CHARS = 300
+
+_live_paths = set()  # spill directories of HistoryStores alive in this process
+_swept_dirs = set()  # base directories already swept by this process
+_registry_lock = threading.Lock()
+
+
+def _forget_path(path: str) -> None:
+    with _registry_lock:
+        _live_paths.discard(path)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def sweep_orphans(base_dir: str = HISTORY_DIR, max_age: float = HISTORY_MAX_AGE) -> int:
+    """Remove session directories untouched for max_age seconds (live stores excluded). Returns how many."""
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(base_dir))
+    except OSError:
+        return 0
+    with _registry_lock:
+        live = set(_live_paths)
+    for entry in entries:
+        try:
+            if entry.is_dir() and os.path.abspath(entry.path) not in live and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def summarize(index: int, result: dict) -> dict:
+    summary = result.get("summary") or ""
+    return {
+        "index": index,
+        "query": result.get("query") or "",
+        "status": result.get("status"),
+        "summary": summary if len(summary) <= SUMMARY_CHARS else summary[:SUMMARY_CHARS] + "…",
+        "token_usage": result.get("token_usage"),
+        "thread_id": result.get("thread_id"),
+    }
+
+
+class HistoryStore:
+    """Append-only list of agent results; latest `keep` in memory, the rest gzip'd on disk.
+
+    The spill directory is removed when the store is cleared or garbage collected;
+    sweep_orphans() removes those of sessions that died without that.
+    """
+
+    def __init__(self, keep: int = HISTORY_KEEP, base_dir: str = HISTORY_DIR, session_id: str = None):
+        self.keep = max(1, keep)
+        self.path = os.path.abspath(os.path.join(base_dir, session_id or uuid.uuid4().hex))
+        self._lock = threading.Lock()
+        self._summaries = []
+        self._hot = {}  # index -> full result (latest `keep`)
+        self._rehydrated = RunCache(max_entries=2)
+        self.spilled = 0
+        self.rehydrations = 0
+        with _registry_lock:
+            _live_paths.add(self.path)
+            first_here = os.path.abspath(base_dir) not in _swept_dirs
+            _swept_dirs.add(os.path.abspath(base_dir))
+        if first_here:
+            sweep_orphans(base_dir)
+        # Session gone -> store collected -> spill files removed.
+        self._finalizer = weakref.finalize(self, _forget_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def _file(self, index: int) -> str:
+        return os.path.join(self.path, f"{index:06d}.json.gz")
+
+    def _touch(self) -> None:
+        # Keeps an idle but live session's directory out of other processes' sweeps.
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _spill(self, index: int, result: dict) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file(index) + ".tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(result, f, default=str)
+        os.replace(tmp, self._file(index))
+        self.spilled += 1
+
+    def append(self, result: dict) -> int:
+        with self._lock:
+            index = len(self._summaries)
+            self._summaries.append(summarize(index, result))
+            self._hot[index] = result
+            for old in sorted(self._hot)[:-self.keep]:
+                self._spill(old, self._hot.pop(old))
+            if self.spilled:
+                self._touch()
+            return index
+
+    def summaries(self) -> list:
+        """Lightweight summaries of every answer, oldest first."""
+        with self._lock:
+            return list(self._summaries)
+
+    def get(self, index: int):
+        """Full result at index (negative indexes count from the end); None if out of range or lost."""
+        with self._lock:
+            if index < 0:
+                index += len(self._summaries)
+            if not 0 <= index < len(self._summaries):
+                return None
+            result = self._hot.get(index)
+        if result is not None:
+            return result
+        self._touch()
+        result = self._rehydrated.get(index)
+        if result is None:
+            try:
+                with gzip.open(self._file(index), "rt", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                return None
+            self.rehydrations += 1
+            self._rehydrated.put(index, result)
+        return result
+
+    def latest(self):
+        return self.get(-1) if self._summaries else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._summaries = []
+            self._hot = {}
+            self._rehydrated.clear()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._summaries),
+                "in_memory": len(self._hot),
+                "spilled": self.spilled,
+                "rehydrations": self.rehydrations,
+            }
@@ -0,0 +1,273 @@
+"""Prometheus-compatible metrics for the agent service, served at /metrics when ADF_METRICS_PORT is set."""
+
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+ARM_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+POLL_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if not self.labelnames and self.kind != "histogram":
+            self._values[()] = 0  # unlabeled counters / gauges are exported from the start
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_labels(self.labelnames, key, extra)} {_num(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]  # bucket counts, count, sum
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, count, total) in self._values.items():
+                for bound, n in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", key, (("le", _num(bound)),), n))
+                samples.append((f"{self.name}_bucket", key, (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_count", key, (), count))
+                samples.append((f"{self.name}_sum", key, (), total))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect) -> None:
+        """collect() -> [(name, kind, help, [(labels dict, value), ...]), ...], called per scrape."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception:
+                continue
+            for name, kind, documentation, samples in families:
+                lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+AGENT_DURATION = REGISTRY.register(Histogram(
+    "adf_agent_duration_seconds", "adf_agent latency by outcome.", ("app", "outcome")))
+AGENT_TOKENS = REGISTRY.register(Histogram(
+    "adf_agent_tokens", "Tokens used per agent query.", ("app", "kind"), TOKEN_BUCKETS))
+AGENT_INFLIGHT = REGISTRY.register(Gauge(
+    "adf_agent_inflight", "adf_agent calls in progress.", ("app",)))
+ACTIVE_RUNS = REGISTRY.register(Gauge(
+    "adf_agent_active_runs", "Agent runs being driven right now."))
+RUN_POLLS = REGISTRY.register(Histogram(
+    "adf_run_poll_iterations", "runs.get polls per agent run.", ("mode",), POLL_BUCKETS))
+ARM_DURATION = REGISTRY.register(Histogram(
+    "adf_arm_request_duration_seconds", "ARM request latency including retries.", ("endpoint",), ARM_BUCKETS))
+ARM_REQUESTS = REGISTRY.register(Counter(
+    "adf_arm_requests_total", "ARM requests by endpoint and final status code.", ("endpoint", "code")))
+
+_ID_SEGMENT = re.compile(r"^[0-9a-fA-F-]{16,}$")
+
+
+def arm_endpoint(path: str) -> str:
+    """Low-cardinality endpoint label: factory-relative path with run ids replaced by {id}."""
+    path = path.split("?", 1)[0].strip("/")
+    return "/".join("{id}" if _ID_SEGMENT.match(seg) else seg for seg in path.split("/")) or "/"
+
+
+def observe_arm_request(path: str, seconds: float, code) -> None:
+    endpoint = arm_endpoint(path)
+    ARM_DURATION.observe(seconds, endpoint=endpoint)
+    ARM_REQUESTS.inc(endpoint=endpoint, code=code if code is not None else "error")
+
+
+def _outcome(result) -> str:
+    if not isinstance(result, dict):
+        return "unknown"
+    if result.get("route"):
+        return "router"
+    if result.get("cached"):
+        return "answer_cache"
+    status = result.get("status") or "unknown"
+    return str(getattr(status, "value", status))
+
+
+def instrument_agent(app: str):
+    """Decorator for adf_agent: latency by outcome, tokens, in-flight gauge."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            AGENT_INFLIGHT.inc(app=app)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = fn(*args, **kwargs)
+                outcome = _outcome(result)
+                # A cache hit replays the original run's usage; it cost no tokens now.
+                usage = {} if outcome == "answer_cache" else (result or {}).get("token_usage") or {}
+                for kind, key in (("prompt", "prompt_tokens"), ("completion", "completion_tokens")):
+                    if usage.get(key) is not None:
+                        AGENT_TOKENS.observe(usage[key], app=app, kind=kind)
+                return result
+            finally:
+                AGENT_DURATION.observe(time.perf_counter() - started, app=app, outcome=outcome)
+                AGENT_INFLIGHT.dec(app=app)
+        return wrapper
+    return decorator
+
+
+def _cache_families():
+    """Lookup counters of the caches of whichever modules are loaded (read at scrape time)."""
+    lookups = []
+    coalesced = []
+    sources = (("adf_cache", "run_cache", "run"), ("adf_answer_cache", "answer_cache", "answer"),
+               ("adf_render", "fragment_cache", "render"))
+    for module_name, attr, label in sources:
+        cache = getattr(sys.modules.get(module_name), attr, None)
+        if cache is not None:
+            stats = cache.stats()
+            lookups.append(({"cache": label, "result": "hit"}, stats.get("hits", 0)))
+            lookups.append(({"cache": label, "result": "miss"}, stats.get("misses", 0) + stats.get("stale", 0)))
+    client = getattr(sys.modules.get("adf_rest"), "_client", None)
+    single_flight = getattr(client, "single_flight", None)
+    if single_flight is not None:
+        coalesced.append(({}, single_flight.stats()["coalesced"]))
+    return [
+        ("adf_cache_lookups_total", "counter", "Cache lookups by cache and result.", lookups),
+        ("adf_arm_coalesced_total", "counter", "ARM requests answered by an identical in-flight request.", coalesced),
+    ]
+
+
+REGISTRY.register_collector(_cache_families)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None, addr: str = None):
+    """Serve /metrics on a daemon thread (once per process). No-op without a port."""
+    global _server
+    if port is None:
+        port = os.environ.get("ADF_METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((addr or os.environ.get("ADF_METRICS_ADDR", "127.0.0.1"), int(port)),
+                                              _MetricsHandler)
+            except OSError as ex:
+                print(f"Metrics endpoint not started on port {port}: {ex}")
+                return None
+            threading.Thread(target=_server.serve_forever, name="adf-metrics", daemon=True).start()
+        return _server
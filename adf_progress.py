@@ -0,0 +1,56 @@
+"""Generator form of adf_agent for live UIs: yields the run's progress events, then the result."""
+
+import queue
+import threading
+
+from adf_tracing import NOOP_SPAN, bind_context, use_span
+
+_DONE = object()
+
+
+def emit_event(on_event, **event) -> None:
+    """Send event to on_event (if any); callback errors are ignored so a UI cannot break a run."""
+    if on_event is None:
+        return
+    try:
+        on_event(event)
+    except Exception:
+        pass
+
+
+def stream_agent_events(agent_fn, query: str, trace_parent=None, **kwargs):
+    """Yield progress events of agent_fn(query, on_event=..., **kwargs), then its result."""
+    events = queue.Queue()
+
+    def _worker():
+        try:
+            with use_span(trace_parent or NOOP_SPAN):
+                result = agent_fn(query, on_event=events.put, **kwargs)
+            events.put({"type": "result", "result": result})
+        except Exception as ex:
+            events.put({"type": "error", "error": f"{type(ex).__name__}: {ex}"})
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=bind_context(_worker), name="adf-agent-run", daemon=True).start()
+    while True:
+        event = events.get()
+        if event is _DONE:
+            return
+        yield event
+
+
+def describe_event(event: dict):
+    """One-line, human readable description of a progress event (None for text deltas / results)."""
+    kind = event.get("type")
+    if kind == "status":
+        return f"Run status: {event.get('status')}"
+    if kind == "step":
+        return f"Step {event.get('step_type')}: {event.get('status')}"
+    if kind == "tool_call":
+        return f"Calling {event.get('name')}({event.get('arguments') or ''})"
+    if kind == "tool_output":
+        return f"{event.get('name')} returned {event.get('chars')} chars"
+    if kind == "error":
+        return f"Error: {event.get('error')}"
+    return None
@@ -0,0 +1,161 @@
+"""Lazy, paginated iterators over Data Factory pipeline / activity run queries, with filters
+and ordering pushed into the request body.
+"""
+
+import datetime
+from itertools import islice
+
+from adf_rest import get_adf_client
+
+PIPELINE_RUN_FIELDS = ["pipelineName", "runId", "status", "runStart", "runEnd", "message"]
+ACTIVITY_RUN_FIELDS = ["activityName", "activityType", "status", "activityRunStart", "activityRunEnd", "durationInMs", "error"]
+
+DEFAULT_WINDOW_HOURS = 48
+
+
+def time_window(hours: float = DEFAULT_WINDOW_HOURS) -> dict:
+    """lastUpdatedAfter / lastUpdatedBefore for the last `hours` hours (UTC, as ADF expects)."""
+    end_time = datetime.datetime.utcnow()
+    start_time = end_time - datetime.timedelta(hours=hours)
+    return {
+        "lastUpdatedAfter": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "lastUpdatedBefore": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def run_window(run: dict, margin_hours: float = 1) -> dict:
+    """lastUpdatedAfter / lastUpdatedBefore around one pipeline run (runStart .. runEnd, now if still running).
+
+    Activity runs are only updated while their pipeline run is, so this finds them however old
+    the run is. None when the run has no parseable runStart.
+    """
+    def parse(value):
+        try:
+            return datetime.datetime.strptime((value or "")[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return None
+
+    start = parse(run.get("runStart"))
+    if start is None:
+        return None
+    now = datetime.datetime.utcnow()
+    margin = datetime.timedelta(hours=margin_hours)
+    end = min((parse(run.get("runEnd")) or now) + margin, now)
+    return {
+        "lastUpdatedAfter": (start - margin).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "lastUpdatedBefore": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+
+
+def compact_record(record: dict, fields) -> dict:
+    return {k: record.get(k) for k in fields if k in record}
+
+
+def table_payload(records, columns, max_cell: int = 300) -> dict:
+    """Column-oriented form of a record list ({"columns": [...], "rows": [[...], ...]}):
+    field names are sent once instead of once per record. Long text cells are truncated."""
+    rows = []
+    for record in records:
+        row = []
+        for col in columns:
+            value = record.get(col)
+            if isinstance(value, str) and len(value) > max_cell:
+                value = value[:max_cell] + "..."
+            row.append(value)
+        rows.append(row)
+    return {"columns": list(columns), "rows": rows}
+
+
+def build_run_query(
+    hours: float = DEFAULT_WINDOW_HOURS,
+    pipeline_names=None,
+    statuses=None,
+    order_by: str = None,
+    descending: bool = True,
+    filters=None,
+    window: dict = None,
+) -> dict:
+    """Build a RunFilterParameters body with filters and ordering pushed down to ADF.
+
+    pipeline_names / statuses: str or list; one value uses Equals, several use In.
+    order_by: RunStart, RunEnd, PipelineName, Status, ActivityRunStart, ... (None = service order).
+    filters: extra raw RunQueryFilter dicts appended as-is.
+    window: explicit {"lastUpdatedAfter", "lastUpdatedBefore"} (overrides hours), e.g. for
+    incremental syncs from a watermark.
+    """
+    payload = dict(window) if window else time_window(hours)
+    query_filters = []
+    for operand, values in (("PipelineName", pipeline_names), ("Status", statuses)):
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        operator = "Equals" if len(values) == 1 else "In"
+        query_filters.append({"operand": operand, "operator": operator, "values": list(values)})
+    query_filters.extend(filters or [])
+    if query_filters:
+        payload["filters"] = query_filters
+    if order_by:
+        payload["orderBy"] = [{"orderBy": order_by, "order": "DESC" if descending else "ASC"}]
+    return payload
+
+
+def iter_pages(path: str, payload: dict, client=None):
+    """Yield each page (`value` list) of a run query, following continuationToken lazily."""
+    client = client or get_adf_client()
+    body = dict(payload)
+    while True:
+        data = client.post_json(path, body)
+        yield data.get("value", []) or []
+        token = data.get("continuationToken")
+        if not token:
+            return
+        body = dict(payload, continuationToken=token)
+
+
+def _iter_records(path: str, payload: dict, fields, limit, client):
+    records = (compact_record(run, fields) for page in iter_pages(path, payload, client=client) for run in page)
+    # islice stops pulling from the page generator once `limit` records were yielded,
+    # so no further continuation requests are made.
+    return islice(records, limit) if limit else records
+
+
+def iter_pipeline_runs(
+    pipeline_name: str = None,
+    hours: float = DEFAULT_WINDOW_HOURS,
+    fields=None,
+    client=None,
+    statuses=None,
+    order_by: str = None,
+    descending: bool = True,
+    limit: int = None,
+    window: dict = None,
+):
+    """Yield compact pipeline run records (optionally for one pipeline) page by page.
+
+    Newest first: iter_pipeline_runs(name, order_by="RunStart", limit=1).
+    """
+    payload = build_run_query(
+        hours, pipeline_names=pipeline_name, statuses=statuses, order_by=order_by, descending=descending, window=window
+    )
+    yield from _iter_records("queryPipelineRuns", payload, fields or PIPELINE_RUN_FIELDS, limit, client)
+
+
+def iter_activity_runs(
+    pipeline_run_id: str,
+    hours: float = DEFAULT_WINDOW_HOURS,
+    fields=None,
+    client=None,
+    statuses=None,
+    order_by: str = None,
+    descending: bool = False,
+    limit: int = None,
+    window: dict = None,
+):
+    """Yield compact activity run records for one pipeline run page by page.
+
+    window: explicit lastUpdatedAfter / lastUpdatedBefore (see run_window), overrides hours.
+    """
+    payload = build_run_query(hours, statuses=statuses, order_by=order_by, descending=descending, window=window)
+    path = f"pipelineruns/{pipeline_run_id}/queryActivityRuns"
+    yield from _iter_records(path, payload, fields or ACTIVITY_RUN_FIELDS, limit, client)
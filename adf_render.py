@@ -0,0 +1,138 @@
+"""Bounded, paginated views of an agent result for the detail panels (gradf.py, stadf.py, stadfops.py)."""
+
+import json
+import os
+import uuid
+
+from adf_cache import RunCache
+
+PAGE_SIZE = int(os.environ.get("ADF_DETAILS_PAGE_SIZE", "25"))
+PREVIEW_CHARS = int(os.environ.get("ADF_DETAILS_PREVIEW_CHARS", "120"))
+OUTPUT_CHARS = int(os.environ.get("ADF_DETAILS_OUTPUT_CHARS", "20000"))
+
+fragment_cache = RunCache(max_entries=int(os.environ.get("ADF_RENDER_CACHE_MAX", "256")))
+
+
+def result_key(result: dict) -> str:
+    """Stable id of a result; stamped into the dict so copies (gr.State, history) share it."""
+    key = result.get("render_key")
+    if not key:
+        key = result["render_key"] = uuid.uuid4().hex
+    return key
+
+
+def cached_fragment(result: dict, name, render):
+    """render() once per (result, name); later calls return the cached value."""
+    key = ("fragment", result_key(result), name)
+    value = fragment_cache.get(key)
+    if value is None:
+        value = render()
+        fragment_cache.put(key, value)
+    return value
+
+
+def preview(value, limit: int = PREVIEW_CHARS) -> str:
+    if value is None or value == "":
+        return ""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _size(value) -> int:
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, str) else len(json.dumps(value, default=str))
+
+
+def tool_call_rows(result: dict) -> list:
+    """One summary row per tool call across all steps (1-based "n"), cached per result."""
+    def _build():
+        rows = []
+        for sidx, step in enumerate(result.get("steps") or [], start=1):
+            for tc in step.get("tool_calls") or []:
+                rows.append({
+                    "n": len(rows) + 1,
+                    "step": step.get("id") or sidx,
+                    "step_status": step.get("status"),
+                    "name": tc.get("name") or tc.get("type") or "tool",
+                    "arguments": preview(tc.get("arguments")),
+                    "output_chars": _size(tc.get("output")),
+                    "nested": len(tc.get("nested_outputs") or []),
+                })
+        return rows
+    return cached_fragment(result, "rows", _build)
+
+
+def page_count(result: dict, page_size: int = PAGE_SIZE) -> int:
+    return max(1, -(-len(tool_call_rows(result)) // page_size))
+
+
+def clamp_page(result: dict, page, page_size: int = PAGE_SIZE) -> int:
+    try:
+        page = int(page or 1)
+    except (TypeError, ValueError):
+        page = 1
+    return min(max(page, 1), page_count(result, page_size))
+
+
+def page_rows(result: dict, page: int, page_size: int = PAGE_SIZE) -> list:
+    page = clamp_page(result, page, page_size)
+    return tool_call_rows(result)[(page - 1) * page_size: page * page_size]
+
+
+def get_tool_call(result: dict, n):
+    """The n-th tool call (1-based, as numbered in tool_call_rows) or None."""
+    try:
+        n = int(n)
+    except (TypeError, ValueError):
+        return None
+    if n < 1:
+        return None
+    seen = 0
+    for step in result.get("steps") or []:
+        calls = step.get("tool_calls") or []
+        if n <= seen + len(calls):
+            return calls[n - seen - 1]
+        seen += len(calls)
+    return None
+
+
+def format_value(value, limit: int = OUTPUT_CHARS) -> str:
+    """Pretty JSON when the value is (or parses as) JSON, else text; capped at limit chars."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value if len(value) <= limit else value[:limit] + "\n... [truncated]"
+    text = json.dumps(value, indent=2, default=str)
+    return text if len(text) <= limit else text[:limit] + "\n... [truncated]"
+
+
+def tool_call_detail(result: dict, n) -> dict:
+    """Formatted arguments / output / nested outputs of one tool call (on demand, cached)."""
+    def _build():
+        tc = get_tool_call(result, n)
+        if tc is None:
+            return {}
+        return {
+            "id": tc.get("id"),
+            "type": tc.get("type"),
+            "name": tc.get("name"),
+            "arguments": format_value(tc.get("arguments")),
+            "output": format_value(tc.get("output")),
+            "nested_outputs": [format_value(o) for o in tc.get("nested_outputs") or []],
+        }
+    return cached_fragment(result, ("tool_call", str(n)), _build)
+
+
+def activity_tools(result: dict) -> list:
+    """Activity tool definitions of all steps, de-duplicated by function name."""
+    def _build():
+        seen = {}
+        for step in result.get("steps") or []:
+            for at in step.get("activity_tools") or []:
+                seen.setdefault(at.get("function"), at)
+        return list(seen.values())
+    return cached_fragment(result, "activity_tools", _build)
@@ -0,0 +1,232 @@
+"""Shared REST client for Data Factory calls against management.azure.com (pooled, bounded, retried).
+Identical concurrent requests share one call and its parsed JSON, which callers must not mutate.
+"""
+
+import datetime
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from adf_auth import ARM_SCOPE, get_token_provider
+from adf_cache import SingleFlight
+from adf_metrics import observe_arm_request
+from adf_tracing import start_span
+
+ARM_BASE_URL = "https://management.azure.com"
+ADF_API_VERSION = "2018-06-01"
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class AdfRestError(Exception):
+    """Raised when an ADF REST call fails after retries (or cannot authenticate)."""
+
+    def __init__(self, status_code, message: str, retries: int = 0):
+        self.status_code = status_code
+        self.message = message
+        self.retries = retries
+        super().__init__(str(self))
+
+    @property
+    def throttled(self) -> bool:
+        return self.status_code == 429
+
+    def __str__(self):
+        if self.status_code is None:
+            return self.message
+        text = f"Error {self.status_code}: {self.message[:500]}"
+        if self.retries:
+            reason = "throttled by ARM" if self.throttled else "transient failure"
+            text += f" ({reason}; gave up after {self.retries} retries)"
+        return text
+
+
+def _window_seconds(payload: dict):
+    try:
+        fmt = "%Y-%m-%dT%H:%M:%SZ"
+        after = datetime.datetime.strptime(payload["lastUpdatedAfter"], fmt)
+        before = datetime.datetime.strptime(payload["lastUpdatedBefore"], fmt)
+        return int((before - after).total_seconds())
+    except Exception:
+        return None
+
+
+def coalesce_key(method: str, path: str, payload=None) -> tuple:
+    """Key for in-flight coalescing: the absolute window timestamps move every second, so
+    callers asking for the same window length at about the same time share one request."""
+    body = payload or {}
+    if "lastUpdatedAfter" in body and "lastUpdatedBefore" in body:
+        window = _window_seconds(body)
+        if window is not None:
+            body = {k: v for k, v in body.items() if k not in ("lastUpdatedAfter", "lastUpdatedBefore")}
+            body["_window_seconds"] = window
+    return method, path, json.dumps(body, sort_keys=True)
+
+
+def _parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP date. Returns seconds or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = email.utils.parsedate_to_datetime(value)
+        return max(0.0, dt.timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class AdfRestClient:
+    """Pooled, retrying client for one Data Factory (subscription / resource group / factory)."""
+
+    def __init__(
+        self,
+        subscription_id: str,
+        resource_group: str,
+        factory_name: str,
+        token_provider=None,
+        pool_size: int = 16,
+        max_concurrency: int = 8,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 30.0,
+        retry_budget: float = 60.0,
+    ):
+        self.subscription_id = subscription_id
+        self.resource_group = resource_group
+        self.factory_name = factory_name
+        self.token_provider = token_provider or get_token_provider()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.retry_budget = retry_budget  # total seconds one request may spend waiting between retries
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.session = requests.Session()
+        # Retries are handled here (Retry-After aware), not by urllib3.
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.single_flight = SingleFlight()
+
+    def factory_url(self, path: str) -> str:
+        """Absolute URL for a path relative to the factory resource, e.g. 'queryPipelineRuns'."""
+        return (
+            f"{ARM_BASE_URL}/subscriptions/{self.subscription_id}/resourceGroups/{self.resource_group}"
+            f"/providers/Microsoft.DataFactory/factories/{self.factory_name}/{path}?api-version={ADF_API_VERSION}"
+        )
+
+    def _auth_header(self) -> dict:
+        try:
+            return {"Authorization": f"Bearer {self.token_provider.get_token(ARM_SCOPE)}"}
+        except Exception as ex:
+            raise AdfRestError(None, f"Auth error: {ex}")
+
+    def _backoff(self, attempt: int, retry_after=None) -> float:
+        # Full jitter; Retry-After (when present) is a floor, not a suggestion.
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(retry_after, delay)
+        return delay
+
+    def request(self, method: str, path: str, payload=None) -> requests.Response:
+        """Send a request with retries. Returns the 2xx response or raises AdfRestError."""
+        trace = start_span("arm.request", attributes={"http.request.method": method, "url.path": path})
+        started = time.perf_counter()
+        code = None
+        try:
+            response = self._send(method, self.factory_url(path), payload, trace)
+            code = response.status_code
+            return response
+        except AdfRestError as ex:
+            code = ex.status_code
+            trace.set_attribute("adf.retry_count", ex.retries)
+            trace.record_exception(ex)
+            raise
+        finally:
+            trace.end()
+            observe_arm_request(path, time.perf_counter() - started, code)
+
+    def _send(self, method: str, url: str, payload, trace) -> requests.Response:
+        reauthenticated = False
+        attempt = 0
+        waited = 0.0
+        while True:
+            headers = self._auth_header()
+            retry_after = None
+            response = None
+            try:
+                with self._slots:
+                    response = self.session.request(method, url, headers=headers, json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                if attempt >= self.max_retries:
+                    raise AdfRestError(None, f"Connection error calling ARM: {ex}", retries=attempt)
+            else:
+                if response.status_code < 300:
+                    trace.set_attributes({
+                        "http.response.status_code": response.status_code,
+                        "http.response.body.size": len(response.content),
+                        "adf.retry_count": attempt,
+                    })
+                    return response
+                if response.status_code == 401 and not reauthenticated:
+                    # Token revoked or rotated underneath us: re-authenticate once.
+                    self.token_provider.invalidate(ARM_SCOPE)
+                    reauthenticated = True
+                    continue
+                trace.set_attribute("http.response.status_code", response.status_code)
+                if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                    raise AdfRestError(response.status_code, response.text, retries=attempt)
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+            delay = self._backoff(attempt, retry_after)
+            if waited + delay > self.retry_budget:
+                # Retrying before Retry-After only earns another 429; give up now.
+                if response is None:
+                    raise AdfRestError(None, f"Connection error calling ARM: retry budget of "
+                                             f"{self.retry_budget:.0f}s exhausted", retries=attempt)
+                wait = f"Retry-After {retry_after:.0f}s" if retry_after is not None else f"Backoff {delay:.0f}s"
+                raise AdfRestError(
+                    response.status_code,
+                    f"{wait} exceeds the {self.retry_budget:.0f}s retry budget: {response.text}",
+                    retries=attempt,
+                )
+            time.sleep(delay)
+            waited += delay
+            attempt += 1
+
+    def get_json(self, path: str) -> dict:
+        return self.single_flight.do(coalesce_key("GET", path), lambda: self.request("GET", path).json())
+
+    def post_json(self, path: str, payload: dict) -> dict:
+        return self.single_flight.do(
+            coalesce_key("POST", path, payload), lambda: self.request("POST", path, payload).json()
+        )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_adf_client() -> AdfRestClient:
+    """Return the process-wide client for the factory configured in the environment."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = AdfRestClient(
+                    os.environ.get("AZURE_SUBSCRIPTION_ID"),
+                    os.environ.get("AZURE_RESOURCE_GROUP"),
+                    os.environ.get("AZURE_DATA_FACTORY_NAME"),
+                    max_concurrency=int(os.environ.get("ADF_MAX_CONCURRENCY", "8")),
+                    max_retries=int(os.environ.get("ADF_MAX_RETRIES", "4")),
+                    retry_budget=float(os.environ.get("ADF_RETRY_BUDGET", "60")),
+                )
+    return _client
@@ -0,0 +1,197 @@
+"""Deterministic fast path for simple ADF status questions (no agent, thread or run)."""
+
+import datetime
+import json
+import os
+import re
+
+from adf_store import get_run_store
+
+ROUTER_ENABLED = os.environ.get("ADF_ROUTER", "1") != "0"
+MAX_QUERY_WORDS = 25
+
+_ACTIVITIES = re.compile(r"\b(activit(y|ies)|steps?|logs?|error details|details|breakdown)\b", re.I)
+_LAST_FAILURE = re.compile(r"\b(when did\b.*\bfail|(last|latest|most recent|previous)\s+(fail(ed|ure|ing)?|error))", re.I)
+_STATUS = re.compile(
+    r"\b(status|state|last run|latest run|how did|how is|did\b.*\b(succeed|fail|run|finish|complete)|"
+    r"is\b.*\b(running|done|finished)|succeed(ed)?|outcome|result)\b",
+    re.I,
+)
+_OPEN_ENDED = re.compile(
+    r"\b(why|how (do|can|to|should|would)|explain|fix|resolve|troubleshoot|recommend|suggest|compare|trend|"
+    r"average|history|docs?|documentation|rest api|sdk|and)\b",
+    re.I,
+)
+
+
+def pipeline_catalog() -> list:
+    names = {n.strip() for n in os.environ.get("ADF_PIPELINE_CATALOG", "").split(",") if n.strip()}
+    store = get_run_store()
+    if store is not None:
+        names.update(store.pipeline_names())
+    return sorted(names)
+
+
+def find_pipelines(query: str, catalog) -> list:
+    """Catalog names mentioned in the query (whole words, case-insensitive, longest match wins)."""
+    spans = []
+    for name in catalog:
+        for m in re.finditer(rf"(?<![\w-]){re.escape(name)}(?![\w-])", query, re.I):
+            spans.append((m.start(), m.end(), name))
+    found = []
+    for start, end, name in spans:
+        if not any(s <= start and end <= e and (e - s) > (end - start) for s, e, _ in spans):
+            found.append(name)
+    return list(dict.fromkeys(found))
+
+
+def classify(query: str):
+    """Return 'activities', 'last_failure', 'status' or None (ambiguous / open-ended)."""
+    if len(query.split()) > MAX_QUERY_WORDS or _OPEN_ENDED.search(query):
+        return None
+    intents = [name for name, rx in (("activities", _ACTIVITIES), ("last_failure", _LAST_FAILURE)) if rx.search(query)]
+    if len(intents) > 1:
+        return None
+    if intents:
+        return intents[0]
+    return "status" if _STATUS.search(query) else None
+
+
+def _parse_ts(value):
+    if not value:
+        return None
+    m = re.match(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?", value)
+    if not m:
+        return None
+    ts = datetime.datetime.strptime(m.group(1), "%Y-%m-%dT%H:%M:%S")
+    if m.group(2):
+        ts += datetime.timedelta(seconds=float(m.group(2)))
+    return ts
+
+
+def _duration(start, end) -> str:
+    s, e = _parse_ts(start), _parse_ts(end)
+    if not s or not e:
+        return ""
+    seconds = int((e - s).total_seconds())
+    return f", took {seconds // 60}m {seconds % 60}s" if seconds >= 60 else f", took {seconds}s"
+
+
+def _run_line(pipeline: str, run: dict) -> str:
+    line = (
+        f"**{pipeline}**: latest run `{run.get('runId')}` is **{run.get('status')}** "
+        f"(started {run.get('runStart') or 'n/a'}, ended {run.get('runEnd') or 'n/a'}{_duration(run.get('runStart'), run.get('runEnd'))})."
+    )
+    if run.get("message"):
+        line += f"\n\nMessage: {run['message']}"
+    return line
+
+
+def _activities_lines(table: dict) -> list:
+    columns = table.get("columns") or []
+    rows = [dict(zip(columns, row)) for row in table.get("rows") or []]
+    rows.sort(key=lambda a: a.get("status") != "Failed")
+    lines = []
+    for a in rows:
+        line = (
+            f"- {a.get('activityName')} ({a.get('activityType')}): **{a.get('status')}**"
+            f"{_duration(a.get('activityRunStart'), a.get('activityRunEnd'))}"
+        )
+        error = a.get("error") or {}
+        if isinstance(error, dict) and error.get("message"):
+            line += f" - {error.get('errorCode', '')} {error['message']}".rstrip()
+        lines.append(line)
+    return lines
+
+
+def _summarize(intent: str, pipeline: str, output: str):
+    """Templated answer; None when the tool output is not the expected JSON (error text)."""
+    try:
+        data = json.loads(output)
+    except ValueError:
+        return None
+    if intent == "status":
+        return _run_line(pipeline, data)
+    if intent == "last_failure":
+        return (
+            f"**{pipeline}** last failed in run `{data.get('runId')}` "
+            f"(started {data.get('runStart') or 'n/a'}, ended {data.get('runEnd') or 'n/a'})."
+            + (f"\n\nMessage: {data['message']}" if data.get("message") else "")
+        )
+    run, activities = data.get("run") or {}, data.get("activities")
+    text = _run_line(pipeline, run)
+    if isinstance(activities, dict) and activities.get("view") == "aggregate":
+        counts = ", ".join(f"{n} {k}" for k, n in activities.get("by_status", {}).items())
+        text += f"\n\n{activities.get('total')} activity runs ({counts})."
+        lines = _activities_lines(activities.get("failed") or {})
+        if lines:
+            text += "\n\nFailed activities:\n" + "\n".join(lines)
+    elif isinstance(activities, dict):
+        lines = _activities_lines(activities)
+        text += "\n\nActivities:\n" + "\n".join(lines) if lines else "\n\nNo activity runs recorded."
+    else:
+        text += f"\n\n{activities}"
+    return text
+
+
+def route_query(query: str, tools: dict, catalog=None, log=print):
+    """Answer a simple question without the agent; None means "use the agent".
+
+    tools: {"adf_pipeline_runs": fn(name, status), "adf_pipeline_run_details": fn(name, status)}.
+    The result has the same shape as stadfops.adf_agent's (plus "route"). Falls through when
+    no or several catalog pipelines are named, several intents match, or the question is
+    open-ended ("why", "how do I", ...) or long. The catalog is ADF_PIPELINE_CATALOG plus
+    every pipeline in the run store.
+    """
+    if not ROUTER_ENABLED or not query:
+        return None
+    intent = classify(query)
+    if intent is None:
+        return None
+    pipelines = find_pipelines(query, pipeline_catalog() if catalog is None else catalog)
+    if len(pipelines) != 1:
+        return None
+    pipeline = pipelines[0]
+
+    logs = [f"Router: intent={intent} pipeline={pipeline} (agent skipped)"]
+    if intent == "activities":
+        func_name, args = "adf_pipeline_run_details", {"pipelinename": pipeline}
+        output = tools[func_name](pipeline, None)
+    else:
+        status = "Failed" if intent == "last_failure" else None
+        func_name, args = "adf_pipeline_runs", {"pipelinename": pipeline, "status": status}
+        output = tools[func_name](pipeline, status)
+    logs.append(f"Tool {func_name}({args}) -> {len(output)} chars")
+
+    summary = _summarize(intent, pipeline, output)
+    status = "completed"
+    if summary is None:
+        # "No runs found ..." is a valid answer; error text is passed on as-is.
+        summary = f"**{pipeline}**: {output}"
+        status = "completed" if output.startswith("No ") else "failed"
+    for line in logs:
+        log(line)
+    return {
+        "summary": summary,
+        "details": "\n".join(logs),
+        "messages": [{"role": "user", "content": query}, {"role": "assistant", "content": summary}],
+        "steps": [{
+            "id": "router",
+            "status": "completed",
+            "tool_calls": [{
+                "id": f"router_{func_name}",
+                "type": "function",
+                "name": func_name,
+                "arguments": json.dumps(args),
+                "output": output,
+                "nested_outputs": [],
+            }],
+            "activity_tools": [],
+            "outputs": [output],
+        }],
+        "token_usage": None,
+        "status": status,
+        "query": query,
+        "thread_id": None,
+        "route": intent,
+    }
@@ -0,0 +1,184 @@
+"""Run driver for Azure AI Agents runs: event stream first, adaptive polling as fallback."""
+
+import os
+import time
+
+from azure.ai.agents.models import AgentStreamEvent, MessageDeltaChunk, RunStep, ThreadRun
+
+from adf_metrics import ACTIVE_RUNS, RUN_POLLS
+from adf_progress import emit_event
+from adf_tracing import current_span, traced
+
+ACTIVE_STATUSES = ("queued", "in_progress", "requires_action")
+
+POLL_INITIAL = float(os.environ.get("ADF_RUN_POLL_INITIAL", "0.1"))
+POLL_MAX = float(os.environ.get("ADF_RUN_POLL_MAX", "2.0"))
+POLL_FACTOR = 1.6
+RUN_MAX_WAIT = float(os.environ.get("ADF_RUN_MAX_WAIT", "120"))
+USE_STREAMING = os.environ.get("ADF_RUN_STREAMING", "1") != "0"
+
+
+def _status(run) -> str:
+    # SDK models return a RunStatus (str) enum; str() of it is "RunStatus.X" on Python 3.11+.
+    status = getattr(run, "status", "") or ""
+    return str(getattr(status, "value", status))
+
+
+def _submit(agents_client, thread_id: str, run_id: str, action: dict, event_handler=None) -> None:
+    if event_handler is not None:
+        agents_client.runs.submit_tool_outputs_stream(
+            thread_id=thread_id, run_id=run_id, event_handler=event_handler, **action
+        )
+        return
+    if "tool_approvals" in action:
+        # Some SDKs have a dedicated approvals call; others multiplex via submit_tool_outputs.
+        submit_method = getattr(agents_client.runs, "submit_tool_approvals", None)
+        if submit_method:
+            submit_method(thread_id=thread_id, run_id=run_id, **action)
+            return
+    agents_client.runs.submit_tool_outputs(thread_id=thread_id, run_id=run_id, **action)
+
+
+def _cancel(agents_client, thread_id: str, run_id: str, log) -> None:
+    try:
+        agents_client.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as ex:
+        log(f"Cancel failed: {ex}")
+
+
+def _cancelled(cancel_event) -> bool:
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def _drive_streaming(agents_client, thread_id, agent_id, handle_required_action, log, deadline, run_kwargs, state,
+                     on_event=None, cancel_event=None):
+    """Consume the run's event stream. The latest ThreadRun seen is kept in state["run"]
+    so the caller can continue by polling if the stream breaks part-way."""
+    last_status = None
+    with agents_client.runs.stream(thread_id=thread_id, agent_id=agent_id, **run_kwargs) as stream:
+        for event_type, data, _ in stream:
+            if isinstance(data, ThreadRun):
+                if state.get("run") is None:
+                    log(f"Run: {data.id}")
+                state["run"] = run = data
+                if _status(run) != last_status:
+                    last_status = _status(run)
+                    log(f"Status: {last_status} (event {event_type})")
+                    emit_event(on_event, type="status", status=last_status)
+                if last_status == "requires_action":
+                    action = handle_required_action(run)
+                    if not action:
+                        log("Nothing to submit for required_action; cancelling to avoid stall")
+                        _cancel(agents_client, thread_id, run.id, log)
+                        return
+                    _submit(agents_client, thread_id, run.id, action, event_handler=stream)
+            elif isinstance(data, MessageDeltaChunk):
+                if data.text:
+                    emit_event(on_event, type="text_delta", text=data.text)
+            elif isinstance(data, RunStep):
+                log(f"Run step {data.id} {getattr(data, 'type', '')} {getattr(data, 'status', '')}")
+                emit_event(on_event, type="step", step_type=str(getattr(data, "type", "")), status=str(getattr(data, "status", "")))
+            elif event_type == AgentStreamEvent.ERROR:
+                log(f"Stream error event: {data}")
+            if time.monotonic() > deadline:
+                log("Max wait reached while streaming")
+                return
+            if _cancelled(cancel_event):
+                log("Cancel requested while streaming")
+                return
+
+
+def _drive_polling(agents_client, thread_id, run, handle_required_action, log, deadline, on_event=None,
+                   cancel_event=None, stats=None):
+    """Poll the run to a terminal state; stats["polls"] counts the runs.get calls."""
+    stats = {} if stats is None else stats
+    interval = POLL_INITIAL
+    last_status = _status(run)
+    polls = 0
+    while _status(run) in ACTIVE_STATUSES and time.monotonic() < deadline and not _cancelled(cancel_event):
+        if _status(run) == "requires_action":
+            action = handle_required_action(run)
+            if not action:
+                log("Nothing to submit for required_action; cancelling to avoid stall")
+                _cancel(agents_client, thread_id, run.id, log)
+                return agents_client.runs.get(thread_id=thread_id, run_id=run.id)
+            try:
+                _submit(agents_client, thread_id, run.id, action)
+            except Exception as ex:
+                log(f"Failed submitting tool outputs: {ex}")
+                # Avoid endless loop if submission fails repeatedly.
+                return run
+            # The run resumes right away; check back quickly.
+            interval = POLL_INITIAL
+        if cancel_event is not None:
+            if cancel_event.wait(interval):
+                break
+        else:
+            time.sleep(interval)
+        interval = min(POLL_MAX, interval * POLL_FACTOR)
+        run = agents_client.runs.get(thread_id=thread_id, run_id=run.id)
+        polls += 1
+        stats["polls"] = polls
+        if _status(run) != last_status:
+            last_status = _status(run)
+            interval = POLL_INITIAL
+            log(f"Status: {last_status} (poll {polls})")
+            emit_event(on_event, type="status", status=last_status)
+    return run
+
+
+@traced("agent.run")
+def drive_run(agents_client, thread_id: str, agent_id: str, handle_required_action, log=print,
+              max_wait: float = RUN_MAX_WAIT, stream: bool = USE_STREAMING, on_event=None, cancel_event=None,
+              **run_kwargs):
+    """Create a run on thread_id and drive it to a terminal state. Returns the final ThreadRun.
+
+    handle_required_action(run) returns {"tool_outputs": [...]}, {"tool_approvals": [...]} or
+    None (nothing to submit: the run is cancelled).
+    on_event(event) receives {"type": "status" | "step" | "text_delta", ...} dicts as the run
+    progresses.
+    Setting cancel_event cancels the run on the service and returns.
+    """
+    ACTIVE_RUNS.inc()
+    try:
+        return _drive_run(agents_client, thread_id, agent_id, handle_required_action, log, max_wait, stream,
+                          on_event, cancel_event, run_kwargs)
+    finally:
+        ACTIVE_RUNS.dec()
+
+
+def _drive_run(agents_client, thread_id, agent_id, handle_required_action, log, max_wait, stream, on_event,
+               cancel_event, run_kwargs):
+    deadline = time.monotonic() + max_wait
+    state = {"run": None}
+    if stream and hasattr(agents_client.runs, "stream"):
+        try:
+            _drive_streaming(agents_client, thread_id, agent_id, handle_required_action, log, deadline, run_kwargs, state,
+                             on_event=on_event, cancel_event=cancel_event)
+        except Exception as ex:
+            if state["run"] is None:
+                log(f"Streaming unavailable ({ex}); falling back to polling")
+            else:
+                log(f"Stream interrupted ({ex}); continuing by polling")
+    run = state["run"]
+    if run is None:
+        run = agents_client.runs.create(thread_id=thread_id, agent_id=agent_id, **run_kwargs)
+        log(f"Run: {run.id}")
+        emit_event(on_event, type="status", status=_status(run))
+    elif _status(run) in ACTIVE_STATUSES:
+        # Stream ended without a terminal event (cancel/disconnect/error): re-read and poll.
+        run = agents_client.runs.get(thread_id=thread_id, run_id=run.id)
+    poll_stats = {}
+    run = _drive_polling(agents_client, thread_id, run, handle_required_action, log, deadline, on_event=on_event,
+                         cancel_event=cancel_event, stats=poll_stats)
+    RUN_POLLS.observe(poll_stats.get("polls", 0), mode="stream" if state["run"] is not None else "poll")
+
+    if _status(run) in ACTIVE_STATUSES and _cancelled(cancel_event):
+        log("Cancel requested; cancelling run")
+        _cancel(agents_client, thread_id, run.id, log)
+        emit_event(on_event, type="status", status="cancelled")
+    elif _status(run) in ACTIVE_STATUSES:
+        log(f"Max wait ({max_wait:.0f}s) reached in status {_status(run)}; cancelling run")
+        _cancel(agents_client, thread_id, run.id, log)
+    current_span().set_attributes({"adf.run_id": run.id, "adf.run_status": _status(run), "adf.streamed": state["run"] is not None})
+    return run
@@ -0,0 +1,118 @@
+"""Fair admission control for serving the agent to many concurrent users (gradf.py)."""
+
+import itertools
+import os
+import threading
+
+SERVE_SLOTS = int(os.environ.get("ADF_SERVE_SLOTS", "8"))
+SERVE_PER_USER = int(os.environ.get("ADF_SERVE_PER_USER", "1"))
+SERVE_MAX_WAITING = int(os.environ.get("ADF_SERVE_MAX_WAITING", "64"))
+
+
+class QueueFull(Exception):
+    """Raised by FairScheduler.enqueue when the backlog is at max_waiting."""
+
+
+class Ticket:
+    __slots__ = ("seq", "session", "granted", "cancel")
+
+    def __init__(self, seq: int, session: str):
+        self.seq = seq
+        self.session = session
+        self.granted = False
+        self.cancel = threading.Event()
+
+
+class FairScheduler:
+    def __init__(self, slots: int = SERVE_SLOTS, per_user: int = SERVE_PER_USER, max_waiting: int = SERVE_MAX_WAITING):
+        self.slots = slots
+        self.per_user = per_user
+        self.max_waiting = max_waiting
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []   # tickets in arrival order
+        self._running = {}   # session -> granted tickets
+        self._grants = itertools.count()
+        self._last_grant = {}  # session -> grant number of its latest admitted ticket
+
+    def _fair_order(self) -> list:
+        """Waiting tickets round-robin by session: each session's 1st, then each 2nd, ...;
+        within a round the least recently served session goes first."""
+        rank = {}
+        keyed = []
+        for t in self._waiting:
+            rank[t.session] = rank.get(t.session, -1) + 1
+            keyed.append((rank[t.session] + len(self._running.get(t.session, ())), self._last_grant.get(t.session, -1), t.seq, t))
+        return [k[-1] for k in sorted(keyed, key=lambda k: k[:3])]
+
+    def _dispatch(self) -> None:
+        running = sum(len(v) for v in self._running.values())
+        for t in self._fair_order():
+            if running >= self.slots:
+                break
+            if len(self._running.get(t.session, ())) >= self.per_user:
+                continue
+            self._waiting.remove(t)
+            t.granted = True
+            self._last_grant[t.session] = next(self._grants)
+            self._running.setdefault(t.session, []).append(t)
+            running += 1
+        self._cond.notify_all()
+
+    def enqueue(self, session: str) -> Ticket:
+        with self._cond:
+            if len(self._waiting) >= self.max_waiting:
+                raise QueueFull(f"{len(self._waiting)} requests already waiting")
+            ticket = Ticket(next(self._seq), session)
+            self._waiting.append(ticket)
+            self._dispatch()
+            return ticket
+
+    def wait(self, ticket: Ticket, timeout: float = 1.0) -> bool:
+        """Block up to timeout for the ticket to be granted. True once granted."""
+        with self._cond:
+            if not ticket.granted and not ticket.cancel.is_set():
+                self._cond.wait(timeout)
+            return ticket.granted
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based place in the fair order (0 once granted)."""
+        with self._cond:
+            if ticket.granted:
+                return 0
+            order = self._fair_order()
+            return order.index(ticket) + 1 if ticket in order else 0
+
+    def release(self, ticket: Ticket) -> None:
+        """Finish (granted) or abandon (waiting) a ticket and admit the next requests."""
+        with self._cond:
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            running = self._running.get(ticket.session, [])
+            if ticket in running:
+                running.remove(ticket)
+                if not running:
+                    del self._running[ticket.session]
+            if ticket.session not in self._running and all(t.session != ticket.session for t in self._waiting):
+                self._last_grant.pop(ticket.session, None)
+            self._dispatch()
+
+    def cancel_session(self, session: str) -> int:
+        """Cancel every waiting and running ticket of a session. Returns how many."""
+        with self._cond:
+            tickets = [t for t in self._waiting if t.session == session] + list(self._running.get(session, []))
+            for t in tickets:
+                t.cancel.set()
+            self._cond.notify_all()
+            return len(tickets)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "running": sum(len(v) for v in self._running.values()),
+                "waiting": len(self._waiting),
+                "slots": self.slots,
+            }
+
+
+scheduler = FairScheduler()
@@ -0,0 +1,48 @@
+"""Thread reuse for UI sessions: follow-up questions go onto the previous thread, with the
+prompt truncated to the last few messages.
+"""
+
+import os
+from itertools import islice
+
+from azure.ai.agents.models import ListSortOrder, TruncationObject
+
+CONTEXT_MESSAGES = int(os.environ.get("ADF_AGENT_CONTEXT_MESSAGES", "8"))
+MAX_PROMPT_TOKENS = int(os.environ["ADF_AGENT_MAX_PROMPT_TOKENS"]) if os.environ.get("ADF_AGENT_MAX_PROMPT_TOKENS") else None
+
+SESSION_INSTRUCTIONS = (
+    "This is a follow-up in an ongoing conversation. Reuse pipeline names, runIds, statuses and "
+    "activity details already present in earlier messages instead of calling the tools again, "
+    "unless the user asks for fresh/current data or the needed detail is not in the conversation. "
+    "Mention the runId you are referring to in your answers so later follow-ups can reuse it."
+)
+
+
+def get_or_create_thread(agents_client, thread_id=None, log=print) -> tuple:
+    """Return (thread_id, reused). Falls back to a new thread if thread_id no longer exists."""
+    if thread_id:
+        try:
+            agents_client.threads.get(thread_id)
+            return thread_id, True
+        except Exception as ex:
+            log(f"Session thread {thread_id} unavailable ({ex}); starting a new thread")
+    thread = agents_client.threads.create()
+    return thread.id, False
+
+
+def session_run_kwargs(reused: bool) -> dict:
+    """Extra runs.create kwargs for session mode: bounded context + follow-up guidance."""
+    kwargs = {"truncation_strategy": TruncationObject(type="last_messages", last_messages=CONTEXT_MESSAGES)}
+    if MAX_PROMPT_TOKENS:
+        kwargs["max_prompt_tokens"] = MAX_PROMPT_TOKENS
+    if reused:
+        kwargs["additional_instructions"] = SESSION_INSTRUCTIONS
+    return kwargs
+
+
+def list_recent_messages(agents_client, thread_id: str, limit: int = None) -> list:
+    """Messages in ascending order; with limit, only the newest `limit` (avoids paging long threads)."""
+    if not limit:
+        return list(agents_client.messages.list(thread_id=thread_id, order=ListSortOrder.ASCENDING))
+    newest = islice(agents_client.messages.list(thread_id=thread_id, order=ListSortOrder.DESCENDING, limit=limit), limit)
+    return list(reversed(list(newest)))
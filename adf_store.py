@@ -0,0 +1,241 @@
+"""Opt-in SQLite store of Data Factory pipeline / activity runs (ADF_RUN_STORE_PATH), synced
+incrementally from a watermark so lookups can be answered locally.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from adf_cache import TERMINAL_STATUSES, run_cache
+from adf_queries import ACTIVITY_RUN_FIELDS, PIPELINE_RUN_FIELDS, compact_record, iter_pipeline_runs
+
+STORE_PATH = os.environ.get("ADF_RUN_STORE_PATH", "")
+BACKFILL_HOURS = float(os.environ.get("ADF_RUN_STORE_BACKFILL_HOURS", "48"))
+MAX_LAG = float(os.environ.get("ADF_RUN_STORE_MAX_LAG", "30"))
+SYNC_INTERVAL = float(os.environ.get("ADF_RUN_STORE_SYNC_INTERVAL", "0"))
+WATERMARK_OVERLAP = datetime.timedelta(minutes=2)
+
+_TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+_SYNC_FIELDS = PIPELINE_RUN_FIELDS + ["lastUpdated"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id TEXT PRIMARY KEY,
+    pipeline_name TEXT,
+    status TEXT,
+    run_start TEXT,
+    last_updated TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_pipeline_runs_name_start ON pipeline_runs (pipeline_name, run_start DESC);
+CREATE INDEX IF NOT EXISTS ix_pipeline_runs_name_status_start ON pipeline_runs (pipeline_name, status, run_start DESC);
+CREATE INDEX IF NOT EXISTS ix_pipeline_runs_status ON pipeline_runs (status);
+CREATE TABLE IF NOT EXISTS activity_runs (
+    pipeline_run_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (pipeline_run_id, seq)
+);
+CREATE TABLE IF NOT EXISTS activity_sync (
+    pipeline_run_id TEXT PRIMARY KEY,
+    complete INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+
+class RunStore:
+    """SQLite-backed run store; safe to share between threads (one connection + lock)."""
+
+    def __init__(self, path: str, client=None, backfill_hours: float = BACKFILL_HOURS, max_lag: float = MAX_LAG):
+        self.path = path
+        self.client = client
+        self.backfill_hours = backfill_hours
+        self.max_lag = max_lag
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+        self.last_sync_error = None
+
+    # --- sync -----------------------------------------------------------------------
+
+    def _sync_state(self):
+        with self._lock:
+            row = self._db.execute("SELECT watermark, synced_at FROM sync_state WHERE name = 'pipeline_runs'").fetchone()
+        return row if row else (None, 0.0)
+
+    def sync(self) -> int:
+        """Pull pipeline runs updated since the watermark. Returns the number of runs upserted.
+
+        Raises adf_rest.AdfRestError on ARM failures (the watermark is left unchanged).
+        """
+        with self._sync_lock:
+            watermark, _ = self._sync_state()
+            now = datetime.datetime.utcnow()
+            if watermark:
+                after = datetime.datetime.strptime(watermark, _TS_FORMAT) - WATERMARK_OVERLAP
+            else:
+                after = now - datetime.timedelta(hours=self.backfill_hours)
+            window = {"lastUpdatedAfter": after.strftime(_TS_FORMAT), "lastUpdatedBefore": now.strftime(_TS_FORMAT)}
+            rows = []
+            for run in iter_pipeline_runs(fields=_SYNC_FIELDS, client=self.client, window=window):
+                if not run.get("runId"):
+                    continue
+                record = compact_record(run, PIPELINE_RUN_FIELDS)
+                rows.append((
+                    run["runId"], run.get("pipelineName"), run.get("status"), run.get("runStart") or "",
+                    run.get("lastUpdated"), json.dumps(record),
+                ))
+                run_cache.note_run_status(run["runId"], run.get("status"))
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO pipeline_runs (run_id, pipeline_name, status, run_start, last_updated, record) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, watermark, synced_at) VALUES ('pipeline_runs', ?, ?)",
+                    (window["lastUpdatedBefore"], time.time()),
+                )
+                self._db.commit()
+            self.last_sync_error = None
+            return len(rows)
+
+    def ensure_fresh(self, max_lag: float = None) -> bool:
+        """Sync inline if the last sync is older than max_lag seconds. False if the sync failed."""
+        max_lag = self.max_lag if max_lag is None else max_lag
+        if time.time() - self._sync_state()[1] <= max_lag:
+            return True
+        try:
+            self.sync()
+            return True
+        except Exception as ex:
+            self.last_sync_error = str(ex)
+            return False
+
+    def start_background_sync(self, interval: float = SYNC_INTERVAL, log=print) -> threading.Thread:
+        """Keep the store warm with a daemon thread syncing every `interval` seconds."""
+        def _loop():
+            while True:
+                try:
+                    self.sync()
+                except Exception as ex:
+                    self.last_sync_error = str(ex)
+                    log(f"Run store sync failed: {ex}")
+                time.sleep(interval)
+        thread = threading.Thread(target=_loop, name="adf-run-store-sync", daemon=True)
+        thread.start()
+        return thread
+
+    # --- reads ----------------------------------------------------------------------
+
+    def latest_run(self, pipeline_name: str, status: str = None):
+        """Newest run (compact record) of a pipeline, optionally with a given status; None if none."""
+        sql = "SELECT record FROM pipeline_runs WHERE pipeline_name = ?"
+        params = [pipeline_name]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        sql += " ORDER BY run_start DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest_runs(self, pipeline_names=None) -> list:
+        """Newest run (compact record) of every pipeline, or of the given pipelines only."""
+        # SQLite fills bare columns of a MAX() aggregate from the row holding the maximum.
+        sql = "SELECT record, MAX(run_start) FROM pipeline_runs"
+        params = list(pipeline_names or [])
+        if params:
+            sql += f" WHERE pipeline_name IN ({', '.join('?' * len(params))})"
+        sql += " GROUP BY pipeline_name ORDER BY pipeline_name"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def pipeline_names(self) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT pipeline_name FROM pipeline_runs WHERE pipeline_name IS NOT NULL").fetchall()
+        return sorted(r[0] for r in rows)
+
+    def run_status(self, run_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT status FROM pipeline_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def run(self, run_id: str):
+        """Stored run (compact record) by runId, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT record FROM pipeline_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def activity_runs(self, pipeline_run_id: str):
+        """Stored activity runs of a finished pipeline run, or None if not (completely) stored."""
+        with self._lock:
+            synced = self._db.execute(
+                "SELECT complete FROM activity_sync WHERE pipeline_run_id = ?", (pipeline_run_id,)
+            ).fetchone()
+            if not synced or not synced[0]:
+                return None
+            rows = self._db.execute(
+                "SELECT record FROM activity_runs WHERE pipeline_run_id = ? ORDER BY seq", (pipeline_run_id,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def put_activity_runs(self, pipeline_run_id: str, records) -> None:
+        """Store activity runs; they are served from the store only if the run was terminal.
+
+        An empty list is never complete: it can be a query window that missed the run.
+        """
+        complete = bool(records) and self.run_status(pipeline_run_id) in TERMINAL_STATUSES
+        with self._lock:
+            self._db.execute("DELETE FROM activity_runs WHERE pipeline_run_id = ?", (pipeline_run_id,))
+            self._db.executemany(
+                "INSERT INTO activity_runs (pipeline_run_id, seq, record) VALUES (?, ?, ?)",
+                [(pipeline_run_id, i, json.dumps(compact_record(r, ACTIVITY_RUN_FIELDS))) for i, r in enumerate(records)],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO activity_sync (pipeline_run_id, complete, synced_at) VALUES (?, ?, ?)",
+                (pipeline_run_id, int(complete), time.time()),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        watermark, synced_at = self._sync_state()
+        with self._lock:
+            runs = self._db.execute("SELECT COUNT(*) FROM pipeline_runs").fetchone()[0]
+        return {
+            "pipeline_runs": runs,
+            "watermark": watermark,
+            "sync_age_s": round(time.time() - synced_at, 1) if synced_at else None,
+            "last_sync_error": self.last_sync_error,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_run_store():
+    """Process-wide RunStore when ADF_RUN_STORE_PATH is set, else None."""
+    global _store
+    if not STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RunStore(STORE_PATH)
+                if SYNC_INTERVAL > 0:
+                    _store.start_background_sync(SYNC_INTERVAL)
+    return _store
@@ -0,0 +1,106 @@
+"""Per-phase latency breakdown of one adf_agent call, returned as result["timings"]."""
+
+import html
+import threading
+import time
+from contextlib import contextmanager
+
+KIND_COLORS = {"phase": "#4c78a8", "run": "#f58518", "tool": "#54a24b"}
+
+
+class Timings:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = []
+        self._run_status = None  # (status, started_at) of the current run status
+
+    def add(self, name: str, start: float, end: float, kind: str = "phase", **attrs) -> None:
+        span = {"name": name, "kind": kind, "start_ms": round((start - self.t0) * 1000, 1),
+                "duration_ms": round((end - start) * 1000, 1)}
+        span.update(attrs)
+        with self._lock:
+            self._spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "phase", **attrs):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter(), kind, **attrs)
+
+    def wrap_dispatch(self, dispatch: dict) -> dict:
+        """Same dispatch table, each function timed as a "tool" span."""
+        def _timed(name, fn):
+            def run(args):
+                with self.span(name, kind="tool"):
+                    return fn(args)
+            return run
+        return {name: _timed(name, fn) for name, fn in dispatch.items()}
+
+    def on_run_event(self, event: dict) -> None:
+        """Feed run progress events; consecutive status events become run:<status> spans."""
+        if event.get("type") != "status":
+            return
+        now = time.perf_counter()
+        with self._lock:
+            previous, self._run_status = self._run_status, (event.get("status"), now)
+        if previous is not None:
+            self.add(f"run:{previous[0]}", previous[1], now, kind="run")
+
+    def finish_run(self) -> None:
+        """Close the open run:<status> span (the terminal status gets no duration)."""
+        with self._lock:
+            previous, self._run_status = self._run_status, None
+        if previous is not None and previous[0] in ("queued", "in_progress", "requires_action"):
+            self.add(f"run:{previous[0]}", previous[1], time.perf_counter(), kind="run")
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        by_kind = {}
+        for s in spans:
+            by_kind[s["kind"]] = round(by_kind.get(s["kind"], 0.0) + s["duration_ms"], 1)
+        return {"total_ms": round((time.perf_counter() - self.t0) * 1000, 1), "spans": spans, "by_kind": by_kind}
+
+
+def chain_events(*callbacks):
+    """One on_event callback fanning out to several (None entries are skipped)."""
+    callbacks = [cb for cb in callbacks if cb is not None]
+
+    def on_event(event):
+        for cb in callbacks:
+            try:
+                cb(event)
+            except Exception:
+                pass
+    return on_event
+
+
+def waterfall_html(timings: dict, max_spans: int = 60) -> str:
+    """Self-contained (inline styled) HTML waterfall of a result's timings."""
+    if not timings or not timings.get("spans"):
+        return "<div style='color:#777;font-style:italic'>No timing data.</div>"
+    total = max(timings.get("total_ms") or 0.0, 1.0)
+    rows = []
+    for s in timings["spans"][:max_spans]:
+        left = 100.0 * s["start_ms"] / total
+        width = max(100.0 * s["duration_ms"] / total, 0.3)
+        color = KIND_COLORS.get(s["kind"], "#888")
+        rows.append(
+            "<div style='display:flex;align-items:center;gap:6px;font-size:11px;line-height:16px'>"
+            f"<div style='width:38%;overflow:hidden;white-space:nowrap;text-overflow:ellipsis'>{html.escape(s['name'])}</div>"
+            "<div style='flex:1;position:relative;height:10px;background:#f1f3f5;border-radius:3px'>"
+            f"<div style='position:absolute;left:{left:.2f}%;width:{min(width, 100 - left):.2f}%;height:10px;"
+            f"background:{color};border-radius:3px'></div></div>"
+            f"<div style='width:70px;text-align:right;font-family:monospace'>{s['duration_ms']:.0f} ms</div>"
+            "</div>"
+        )
+    if len(timings["spans"]) > max_spans:
+        rows.append(f"<div style='font-size:11px;color:#777'>… {len(timings['spans']) - max_spans} more spans</div>")
+    totals = " • ".join(f"{k}: {v:.0f} ms" for k, v in (timings.get("by_kind") or {}).items())
+    return (
+        f"<div><div style='font-size:11px;color:#555;margin-bottom:4px'>Total {timings['total_ms']:.0f} ms"
+        f"{' • ' + totals if totals else ''}</div>{''.join(rows)}</div>"
+    )
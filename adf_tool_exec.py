@@ -0,0 +1,81 @@
+"""Concurrent execution of the function tool calls in one requires_action payload."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from adf_serving import SERVE_SLOTS
+from adf_tracing import bind_context, span
+
+TOOL_WORKERS = int(os.environ.get("ADF_TOOL_WORKERS", str(4 * SERVE_SLOTS)))
+TOOL_TIMEOUT = float(os.environ.get("ADF_TOOL_TIMEOUT", "45"))
+TOOL_QUEUE_TIMEOUT = float(os.environ.get("ADF_TOOL_QUEUE_TIMEOUT", str(TOOL_TIMEOUT)))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="adf-tool")
+
+
+class _Start:
+    """Set by the worker when a call begins running."""
+
+    __slots__ = ("event", "at")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.at = None
+
+    def mark(self) -> None:
+        self.at = time.monotonic()
+        self.event.set()
+
+
+def _traced_call(func_name: str, fn, args_dict, start: _Start):
+    start.mark()
+    with span(f"tool {func_name}", **{"adf.tool.name": func_name}) as s:
+        output = fn(args_dict)
+        s.set_attribute("adf.tool.output_chars", len(output or ""))
+        return output
+
+
+def run_tool_calls(calls, dispatch: dict, timeout: float = TOOL_TIMEOUT, log=print,
+                   queue_timeout: float = TOOL_QUEUE_TIMEOUT) -> list:
+    """Execute calls concurrently and return [(call_id, output or None), ...] in call order.
+
+    calls: list of (call_id, func_name, args_dict).
+    dispatch: func_name -> callable(args_dict) returning the output string.
+    Calls to unknown functions yield output None (the caller decides what to do).
+    """
+    futures = []
+    for call_id, func_name, args_dict in calls:
+        fn = dispatch.get(func_name)
+        if fn is None:
+            futures.append((call_id, func_name, None, None, None))
+            continue
+        start = _Start()
+        future = _executor.submit(bind_context(_traced_call), func_name, fn, args_dict, start)
+        futures.append((call_id, func_name, future, start, time.monotonic() + queue_timeout))
+
+    results = []
+    for call_id, func_name, future, start, queue_deadline in futures:
+        if future is None:
+            results.append((call_id, None))
+            continue
+        if not start.event.wait(max(0.0, queue_deadline - time.monotonic())):
+            if future.cancel():
+                output = f"Tool {func_name} did not start within {queue_timeout:.0f}s (tool workers busy); data not available."
+                log(f"Tool call {call_id} ({func_name}) never started; cancelled")
+                results.append((call_id, output))
+                continue
+            start.event.wait(timeout)  # picked up by a worker just now
+        started_at = start.at if start.at is not None else time.monotonic()
+        try:
+            output = future.result(timeout=max(0.0, started_at + timeout - time.monotonic()))
+        except FutureTimeout:
+            # The worker keeps running in the background; its result is discarded.
+            output = f"Tool {func_name} timed out after {timeout:.0f}s; data not available."
+            log(f"Tool call {call_id} ({func_name}) timed out")
+        except Exception as ex:
+            output = f"Tool {func_name} failed: {ex}"
+            log(f"Tool call {call_id} ({func_name}) raised: {ex}")
+        results.append((call_id, output))
+    return results
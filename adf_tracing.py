@@ -0,0 +1,254 @@
+"""Optional, OpenTelemetry-style tracing of adf_agent calls down to the ARM requests, with
+pluggable exporters (ADF_TRACING).
+"""
+
+import atexit
+import contextvars
+import functools
+import importlib
+import json
+import os
+import secrets
+import threading
+import time
+
+TRACE_FILE = os.environ.get("ADF_TRACE_FILE", "adf_traces.jsonl")
+SERVICE_NAME = "adf-agent"
+
+_current = contextvars.ContextVar("adf_current_span", default=None)
+_exporter = None
+
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, parent=None, attributes=None):
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.error = None
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict) -> None:
+        for key, value in (attributes or {}).items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, ex: BaseException) -> None:
+        self.status = "ERROR"
+        self.error = f"{type(ex).__name__}: {ex}"
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        exporter = _exporter
+        if exporter is not None:
+            try:
+                exporter.export(self.to_dict())
+            except Exception:
+                pass  # tracing must never break a query
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    trace_id = span_id = parent_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_exception(self, ex):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span():
+    """The active span, or the no-op span (safe to call set_attribute on either)."""
+    return _current.get() or NOOP_SPAN
+
+
+def start_span(name: str, parent=None, attributes=None):
+    """Start a span without activating it (end() it yourself). parent defaults to the active span."""
+    if _exporter is None:
+        return NOOP_SPAN
+    if parent is None or parent is NOOP_SPAN:
+        parent = _current.get()
+    return Span(name, parent, attributes)
+
+
+class use_span:
+    """Activate span for the with-block; exceptions are recorded, the span is ended if end=True."""
+
+    __slots__ = ("span", "end_on_exit", "_token")
+
+    def __init__(self, span, end: bool = False):
+        self.span = span
+        self.end_on_exit = end
+        self._token = None
+
+    def __enter__(self):
+        if isinstance(self.span, Span):
+            self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is not None:
+            _current.reset(self._token)
+        if exc is not None:
+            self.span.record_exception(exc)
+        if self.end_on_exit:
+            self.span.end()
+        return False
+
+
+def span(name: str, **attributes):
+    """with span("arm.request", method="POST") as s: ... (no-op when tracing is off)."""
+    if _exporter is None:
+        return NOOP_SPAN
+    return use_span(Span(name, _current.get(), attributes), end=True)
+
+
+def traced(name: str = None):
+    """Decorator: run the function inside a span (function name by default)."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _exporter is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind_context(fn):
+    """fn bound to the caller's context (active span), for handing work to another thread."""
+    if _exporter is None:
+        return fn
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+class JsonlFileExporter:
+    """One flat JSON span per line."""
+
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _line(self, span: dict) -> str:
+        return json.dumps(span, default=str, separators=(",", ":"))
+
+    def export(self, span: dict) -> None:
+        line = self._line(span)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpFileExporter(JsonlFileExporter):
+    """OTLP/JSON (ExportTraceServiceRequest) per line, as written by the OTel file exporter."""
+
+    def _line(self, span: dict) -> str:
+        otlp_span = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(span["end_ns"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span["attributes"].items()],
+            "status": {"code": 2, "message": span["error"]} if span["status"] == "ERROR" else {"code": 1},
+        }
+        if span["parent_id"]:
+            otlp_span["parentSpanId"] = span["parent_id"]
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "adf_tracing"}, "spans": [otlp_span]}],
+        }]}
+        return json.dumps(request, separators=(",", ":"))
+
+
+def set_exporter(exporter) -> None:
+    """Install an exporter (object with export(span_dict)); None turns tracing off."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter and hasattr(previous, "shutdown"):
+        try:
+            previous.shutdown()
+        except Exception:
+            pass
+
+
+def _exporter_from_env():
+    spec = os.environ.get("ADF_TRACING", "").strip()
+    if not spec or spec == "0":
+        return None
+    if spec == "jsonl":
+        return JsonlFileExporter(TRACE_FILE)
+    if spec == "otlp":
+        return OtlpFileExporter(TRACE_FILE)
+    module_name, _, attr = spec.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), attr)()
+    except Exception as ex:
+        print(f"ADF_TRACING={spec!r} could not be loaded ({ex}); tracing disabled")
+        return None
+
+
+set_exporter(_exporter_from_env())
+atexit.register(lambda: set_exporter(None))
@@ -4,6 +4,8 @@ from azure.identity import ClientSecretCredential, DefaultAzureCredential
 import os
 import msal
 
+from adf_rest import AdfRestError, get_adf_client
+
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,31 +26,15 @@ pipeline_run_id = "processELT"
 def adf_get_pipeline_status(runid):
 
     returntxt = ""
-    # === AUTHENTICATION ===
-    # Get a token from Azure AD
-    scope = "https://management.azure.com/.default"
-    # credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-    credential = DefaultAzureCredential()
-    token = credential.get_token(scope).token
-
-    # === API CALL ===
-    url = f"https://management.azure.com/subscriptions/{subscription_id}/resourceGroups/{resource_group}/providers/Microsoft.DataFactory/factories/{factory_name}/pipelineruns/{pipeline_run_id}?api-version=2018-06-01"
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        pipeline_status = response.json()
+    # === API CALL (shared pooled + retrying client, see adf_rest.py) ===
+    try:
+        pipeline_status = get_adf_client().get_json(f"pipelineruns/{pipeline_run_id}")
         print("Pipeline Run Status:", pipeline_status.get("status"))
         returntxt = pipeline_status.get("status")
         print("Details:", pipeline_status)
-    else:
-        print("Error:", response.status_code, response.text)
-        returntxt = f"Error: {response.status_code}, {response.text}"
+    except AdfRestError as ex:
+        print("Error:", ex)
+        returntxt = str(ex)
 
     return returntxt
 
@@ -64,20 +50,7 @@ def adf_pipeline_runs():
     end_time = datetime.datetime.utcnow()
     start_time = end_time - datetime.timedelta(hours=48)
 
-    # === AUTHENTICATION ===
-    scope = "https://management.azure.com/.default"
-    # credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-    credential = DefaultAzureCredential()
-    token = credential.get_token(scope).token
-
-    # === API CALL: Query pipeline runs ===
-    url = f"https://management.azure.com/subscriptions/{subscription_id}/resourceGroups/{resource_group}/providers/Microsoft.DataFactory/factories/{factory_name}/queryPipelineRuns?api-version=2018-06-01"
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
+    # === API CALL: Query pipeline runs (shared pooled client, see adf_rest.py) ===
     payload = {
         "lastUpdatedAfter": start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
         "lastUpdatedBefore": end_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
@@ -86,21 +59,21 @@ def adf_pipeline_runs():
         ]
     }
 
-    response = requests.post(url, headers=headers, json=payload)
-
-    if response.status_code == 200:
-        runs = response.json().get("value", [])
-        if runs:
-            latest_run = runs[0]   # usually the most recent first
-            print("Pipeline Name:", latest_run["pipelineName"])
-            print("Run ID:", latest_run["runId"])
-            print("Status:", latest_run["status"])
-            returntxt = print("Status:", latest_run["status"])
-        else:
-            print("No runs found for pipeline:", pipeline_name)
-            returntxt = "No runs found for pipeline."
+    try:
+        runs = get_adf_client().post_json("queryPipelineRuns", payload).get("value", [])
+    except AdfRestError as ex:
+        print("Error:", ex)
+        return returntxt
+
+    if runs:
+        latest_run = runs[0]   # usually the most recent first
+        print("Pipeline Name:", latest_run["pipelineName"])
+        print("Run ID:", latest_run["runId"])
+        print("Status:", latest_run["status"])
+        returntxt = print("Status:", latest_run["status"])
     else:
-        print("Error:", response.status_code, response.text)
+        print("No runs found for pipeline:", pipeline_name)
+        returntxt = "No runs found for pipeline."
 
     return returntxt
 
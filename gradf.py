@@ -5,20 +5,41 @@ It relies on the adf_agent function defined in stadf.py to perform the agent run
 display both summarized output and detailed tool call / step information.
 """
 
+import html
+import time
 from typing import List, Tuple
 import gradio as gr
 from stadf import adf_agent  # reuse existing logic
+from adf_progress import describe_event, stream_agent_events
+from adf_render import (activity_tools, cached_fragment, clamp_page, page_count, page_rows, preview,
+                        tool_call_detail, tool_call_rows)
+from adf_metrics import start_metrics_server
+from adf_timing import waterfall_html
+from adf_tracing import start_span
+from adf_serving import SERVE_MAX_WAITING, SERVE_SLOTS, QueueFull, scheduler
 
 INTRO_TEXT = (
     "# Azure Data Factory Agent (Gradio)\n"
     "Ask about ADF job status. Left shows summarized assistant reply + token usage. "
-    "Right shows full conversation, steps, tool calls, and outputs."
+    "Right shows the conversation and a paginated list of steps / tool calls; load any tool call's output by number."
 )
+MESSAGE_CHARS = 4000
 
 
-def format_details(agent_result: dict) -> str:
+def _esc(text) -> str:
+    return html.escape(str(text or ""), quote=False)
+
+
+def format_details(agent_result: dict, page: int = 1) -> str:
+    """Conversation + one page of tool calls (previews only; outputs load on demand).
+    Rendered pages are cached per result (see adf_render.py)."""
     if not agent_result:
         return "<em>No details yet.</em>"
+    page = clamp_page(agent_result, page)
+    return cached_fragment(agent_result, ("gradio_details", page), lambda: _render_details(agent_result, page))
+
+
+def _render_details(agent_result: dict, page: int) -> str:
     messages = agent_result.get("messages", [])
     steps = agent_result.get("steps", [])
     token_usage = agent_result.get("token_usage") or {}
@@ -30,7 +51,7 @@ def format_details(agent_result: dict) -> str:
         for m in messages:
             role_raw = m.get("role", "?")
             role = role_raw.title()
-            content = (m.get("content") or "").replace("<", "&lt;").replace(">", "&gt;")
+            content = _esc(preview(m.get("content"), MESSAGE_CHARS))
             role_cls = f"msg-role-{role_raw}"
             parts.append(
                 f"<div class='message {role_cls}'>"
@@ -41,53 +62,50 @@ def format_details(agent_result: dict) -> str:
     else:
         parts.append("<div class='empty'>No messages.</div>")
 
-    # Steps & tool calls
+    # Steps & tool calls: one page of summary rows, grouped by step
+    rows = tool_call_rows(agent_result)
+    pages = page_count(agent_result)
     parts.append("<div class='section-title'>Steps & Tool Calls</div>")
-    if steps:
-        for s in steps:
-            sid = s.get('id')
-            status = s.get('status')
-            parts.append(f"<div class='step-card'><div class='step-header'>Step {sid} • {status}</div>")
-            # Tool calls table
-            tcs = s.get('tool_calls') or []
-            if tcs:
-                parts.append("<table class='tool-table'><thead><tr><th>ID</th><th>Type</th><th>Name</th><th>Args</th><th>Output</th></tr></thead><tbody>")
-                for tc in tcs:
-                    args_repr = ''
-                    if tc.get('arguments'):
-                        try:
-                            args_repr = str(tc.get('arguments'))
-                        except Exception:
-                            args_repr = '[args error]'
-                    output_repr = ''
-                    if tc.get('output'):
-                        out = str(tc.get('output'))
-                        output_repr = out if len(out) < 120 else out[:120] + '…'
-                    parts.append(
-                        "<tr>" \
-                        f"<td><code>{tc.get('id') or ''}</code></td>" \
-                        f"<td>{tc.get('type') or ''}</td>" \
-                        f"<td>{tc.get('name') or ''}</td>" \
-                        f"<td><pre>{args_repr}</pre></td>" \
-                        f"<td><pre>{output_repr}</pre></td>" \
-                        "</tr>"
-                    )
-                parts.append("</tbody></table>")
-            # Activity tool definitions
-            acts = s.get('activity_tools') or []
-            if acts:
-                parts.append("<div class='activity-tools'>")
-                for at in acts:
-                    params = ', '.join(at.get('parameters') or [])
-                    parts.append(
-                        f"<div class='activity-tool'><span class='fname'>{at.get('function')}</span> – {at.get('description')}" +
-                        (f" <span class='params'>(params: {params})</span>" if params else "") + "</div>"
-                    )
-                parts.append("</div>")
-            parts.append("</div>")  # step-card
+    parts.append(f"<div class='pager'>{len(steps)} steps • {len(rows)} tool calls • page {page} of {pages}</div>")
+    if rows:
+        current_step = None
+        for row in page_rows(agent_result, page):
+            if row["step"] != current_step:
+                if current_step is not None:
+                    parts.append("</tbody></table></div>")
+                current_step = row["step"]
+                parts.append(f"<div class='step-card'><div class='step-header'>Step {_esc(row['step'])} • {_esc(row['step_status'])}</div>")
+                parts.append("<table class='tool-table'><thead><tr><th>#</th><th>Name</th><th>Args</th><th>Output</th></tr></thead><tbody>")
+            output = f"{row['output_chars']:,} chars" if row["output_chars"] else ""
+            if row["nested"]:
+                output += f" (+{row['nested']} nested)"
+            parts.append(
+                "<tr>"
+                f"<td>{row['n']}</td>"
+                f"<td>{_esc(row['name'])}</td>"
+                f"<td><pre>{_esc(row['arguments'])}</pre></td>"
+                f"<td>{output}</td>"
+                "</tr>"
+            )
+        parts.append("</tbody></table></div>")
+        parts.append("<div class='empty'>Enter a tool call # below to load its full arguments and output.</div>")
+    elif steps:
+        parts.append("<div class='empty'>No tool calls.</div>")
     else:
         parts.append("<div class='empty'>No steps.</div>")
 
+    # Activity tool definitions (de-duplicated across steps)
+    acts = activity_tools(agent_result)
+    if acts:
+        parts.append("<div class='section-title small'>Activity Tools</div><div class='activity-tools'>")
+        for at in acts:
+            params = ', '.join(at.get('parameters') or [])
+            parts.append(
+                f"<div class='activity-tool'><span class='fname'>{_esc(at.get('function'))}</span> – {_esc(at.get('description'))}" +
+                (f" <span class='params'>(params: {_esc(params)})</span>" if params else "") + "</div>"
+            )
+        parts.append("</div>")
+
     # Token usage inline (optional duplicate)
     if token_usage:
         parts.append("<div class='section-title small'>Token Usage</div>")
@@ -100,6 +118,25 @@ def format_details(agent_result: dict) -> str:
     return "".join(parts)
 
 
+def format_tool_call(agent_result: dict, n) -> str:
+    """Full arguments / output / nested outputs of tool call #n, loaded on demand."""
+    if not agent_result:
+        return ""
+    detail = tool_call_detail(agent_result, n)
+    if not detail:
+        return f"No tool call #{n}."
+    sections = [f"# {detail.get('name') or detail.get('type')} ({detail.get('id')})",
+                "## Arguments", detail["arguments"] or "(none)", "## Output", detail["output"] or "(none)"]
+    for i, nested in enumerate(detail["nested_outputs"], start=1):
+        sections += [f"## Nested output {i}", nested]
+    return "\n".join(sections)
+
+
+def change_page(agent_result: dict, page, delta: int = 0):
+    page = clamp_page(agent_result or {}, (page or 1) + delta) if agent_result else 1
+    return format_details(agent_result, page), page
+
+
 def format_summary(agent_result: dict) -> str:
     if not agent_result:
         return "<em>No summary yet.</em>"
@@ -116,20 +153,98 @@ def format_summary(agent_result: dict) -> str:
         f"<div class='summary-text'>{summary}</div>",
         "<div class='section-title small'>Token Usage</div>",
         f"<div class='summary-usage'>{badges}</div>",
+        "<div class='section-title small'>Timings</div>",
+        waterfall_html(agent_result.get("timings")),
         "</div>",
     ]
     return "".join(sections)
 
 
-def chat_fn(message: str, history: List[Tuple[str, str]], state: dict):
+def format_progress(lines: List[str], partial_text: str) -> str:
+    """Summary panel while the run is in flight: progress lines + streamed assistant text."""
+    items = "".join(f"<div class='progress-line'>{l.replace('<', '&lt;').replace('>', '&gt;')}</div>" for l in lines[-12:])
+    text = partial_text.replace("<", "&lt;").replace(">", "&gt;") or "<span class='empty'>Waiting for the agent…</span>"
+    return (
+        "<div class='summary-root'>"
+        "<div class='summary-header'><span class='summary-title'>Assistant Summary</span>"
+        "<span class='status-badge'>RUNNING</span></div>"
+        f"<div class='summary-text'>{text}</div>"
+        f"<div class='section-title small'>Progress</div><div class='progress'>{items}</div>"
+        "</div>"
+    )
+
+
+def _session_id(request) -> str:
+    return getattr(request, "session_hash", None) or "anonymous"
+
+
+def chat_fn(message: str, history: List[Tuple[str, str]], state: dict, keep_context: bool = False,
+            request: gr.Request = None):
+    """Generator: waits for a fair slot (see adf_serving.py), yields progress updates while
+    the agent runs, then the final result. Closing the generator (client disconnected,
+    Stop pressed) cancels the agent run."""
     history = history or []
     if not message:
-        return history, "<em>No summary yet.</em>", "<em>No details yet.</em>", state or {}
+        yield history, "<em>No summary yet.</em>", "<em>No details yet.</em>", state or {}
+        return
     history.append((message, ""))
-    agent_result = adf_agent(message)
+    try:
+        ticket = scheduler.enqueue(_session_id(request))
+    except QueueFull:
+        yield history, format_progress(["Server busy: too many requests waiting. Please retry in a minute."], ""), \
+            "<em>No details yet.</em>", state or {}
+        return
+    finished = False
+    # Root span of the query's trace (no-op unless tracing is on, see adf_tracing.py). The
+    # generator may resume on different threads, so the span is passed down, not activated.
+    ui_span = start_span("ui.gradio.chat", attributes={"adf.session": keep_context})
+    queued_at = time.perf_counter()
+    try:
+        while not scheduler.wait(ticket, timeout=1.0):
+            if ticket.cancel.is_set():
+                return
+            yield history, format_progress([f"Waiting for a free agent slot: position {scheduler.position(ticket)} in queue"], ""), \
+                "<em>Queued…</em>", state or {}
+        ui_span.set_attribute("adf.queue_wait_ms", round((time.perf_counter() - queued_at) * 1000, 1))
+        yield from _run_agent(message, history, state, keep_context, ticket.cancel, ui_span)
+        finished = True
+    finally:
+        if not finished:
+            ticket.cancel.set()
+        ui_span.set_attribute("adf.cancelled", not finished)
+        ui_span.end()
+        scheduler.release(ticket)
+
+
+def _run_agent(message: str, history: List[Tuple[str, str]], state: dict, keep_context: bool, cancel_event,
+               trace_parent=None):
+    # state holds the previous agent_result; in session mode continue its thread.
+    thread_id = (state or {}).get("thread_id") if keep_context else None
+    lines: List[str] = []
+    partial = ""
+    agent_result = None
+    yield history, format_progress(lines, partial), "<em>Run in progress…</em>", state or {}
+    for event in stream_agent_events(adf_agent, message, thread_id=thread_id, session=keep_context,
+                                     cancel_event=cancel_event, trace_parent=trace_parent):
+        if event["type"] == "result":
+            agent_result = event["result"]
+            continue
+        if event["type"] == "error":
+            agent_result = {"summary": event["error"], "details": event["error"], "messages": [], "steps": [],
+                            "token_usage": None, "status": "failed", "thread_id": None}
+            continue
+        if event["type"] == "text_delta":
+            partial += event["text"]
+            history[-1] = (message, partial)
+        else:
+            line = describe_event(event)
+            if not line:
+                continue
+            lines.append(line)
+        yield history, format_progress(lines, partial), "<em>Run in progress…</em>", state or {}
     reply = agent_result.get("summary") or "(no reply)"
     history[-1] = (message, reply)
-    return history, format_summary(agent_result), format_details(agent_result), agent_result
+    yield history, format_summary(agent_result), format_details(agent_result), agent_result
 
 
 with gr.Blocks(css="""
@@ -173,6 +288,9 @@ body, html {height:100vh; margin:0; padding:0; font-family: 'Segoe UI', Arial, s
 .summary-text {font-size:14px; line-height:1.35; white-space:pre-wrap;}
 .summary-usage {display:flex; flex-wrap:wrap;}
 .details-root {font-size:13px; line-height:1.3;}
+.progress {font-size:12px; font-family:monospace; color:#444;}
+.progress-line {padding:1px 0;}
+.pager {font-size:11px; color:#555; margin:2px 0 4px;}
 """, elem_id="root", title="ADF Agent Gradio") as demo:
     gr.Markdown(INTRO_TEXT)
     state = gr.State({})
@@ -183,13 +301,42 @@ body, html {height:100vh; margin:0; padding:0; font-family: 'Segoe UI', Arial, s
             summary_html = gr.HTML(value="<em>No summary yet.</em>", elem_id="summary", elem_classes=["panel"])
         with gr.Column(scale=1, min_width=400):
             detail_html = gr.HTML(value="<em>No details yet.</em>", elem_id="details", elem_classes=["panel"])
+            with gr.Row():
+                prev_btn = gr.Button("◀ Prev", size="sm")
+                details_page = gr.Number(value=1, precision=0, label="Page", minimum=1)
+                next_btn = gr.Button("Next ▶", size="sm")
+            with gr.Row():
+                tool_call_no = gr.Number(value=None, precision=0, label="Tool call #", minimum=1)
+                show_btn = gr.Button("Load output", size="sm")
+            tool_call_view = gr.Code(value="", label="Tool call output", language="markdown", lines=12)
     with gr.Row(elem_classes=["bottom"]):
         chat_in = gr.Textbox(label="Ask", placeholder="Ask about ADF job status…", lines=2, elem_id="chatbox")
         send_btn = gr.Button("Send", variant="primary")
+        stop_btn = gr.Button("Stop")
         clear_btn = gr.Button("Clear")
+        keep_context = gr.Checkbox(label="Keep conversation context", value=False)
+
+    # Waiting requests sit in chat_fn (fair scheduler), so Gradio must let them all in.
+    chat_events = [
+        trigger(chat_fn, inputs=[chat_in, history, state, keep_context], outputs=[history, summary_html, detail_html, state],
+                concurrency_limit=SERVE_SLOTS + SERVE_MAX_WAITING)
+        for trigger in (chat_in.submit, send_btn.click)
+    ]
+
+    def stop_cb(request: gr.Request):
+        scheduler.cancel_session(_session_id(request))
+    stop_btn.click(stop_cb, cancels=chat_events)
+    # Tab closed / connection lost: cancel whatever this session still has queued or running.
+    demo.unload(stop_cb)
 
-    chat_in.submit(chat_fn, inputs=[chat_in, history, state], outputs=[history, summary_html, detail_html, state])
-    send_btn.click(chat_fn, inputs=[chat_in, history, state], outputs=[history, summary_html, detail_html, state])
+    # Details pagination / on-demand outputs: rendered from the cached fragments of `state`.
+    prev_btn.click(lambda st, p: change_page(st, p, -1), inputs=[state, details_page], outputs=[detail_html, details_page])
+    next_btn.click(lambda st, p: change_page(st, p, 1), inputs=[state, details_page], outputs=[detail_html, details_page])
+    details_page.submit(change_page, inputs=[state, details_page], outputs=[detail_html, details_page])
+    show_btn.click(format_tool_call, inputs=[state, tool_call_no], outputs=[tool_call_view])
+    tool_call_no.submit(format_tool_call, inputs=[state, tool_call_no], outputs=[tool_call_view])
+    # A new answer starts on page 1 with no output loaded.
+    state.change(lambda: (1, ""), outputs=[details_page, tool_call_view])
 
     def clear_cb():
         return [], "<em>No summary yet.</em>", "<em>No details yet.</em>", {}
@@ -199,4 +346,9 @@ body, html {height:100vh; margin:0; padding:0; font-family: 'Segoe UI', Arial, s
     demo.load(None, None, None, js="document.getElementById('chatbox') && document.getElementById('chatbox').focus();")
 
 if __name__ == "__main__":
-    demo.queue().launch()
\ No newline at end of file
+    start_metrics_server()  # /metrics for Prometheus when ADF_METRICS_PORT is set (adf_metrics.py)
+    # Explicit queue: bounded backlog (backpressure) and enough handler threads for the
+    # waiting generators; actual agent concurrency is ADF_SERVE_SLOTS (adf_serving.py).
+    demo.queue(max_size=SERVE_MAX_WAITING, default_concurrency_limit=SERVE_SLOTS).launch(
+        max_threads=SERVE_SLOTS + SERVE_MAX_WAITING + 8
+    )
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""Local caching proxy for the MCP documentation server (Streamable HTTP transport).
+tools/call results are cached on disk for a TTL; see --help, and --stub for an offline upstream.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+DEFAULT_UPSTREAM = os.environ.get("MCP_UPSTREAM_URL", "https://learn.microsoft.com/api/mcp")
+DEFAULT_CACHE_DIR = os.environ.get("MCP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".mcp_cache"))
+DEFAULT_TTL = float(os.environ.get("MCP_CACHE_TTL", "86400"))
+
+# Request headers forwarded to the upstream (and the session header forwarded back).
+FORWARD_HEADERS = ("Accept", "Content-Type", "Authorization", "Mcp-Session-Id", "MCP-Protocol-Version", "Last-Event-ID")
+RETURN_HEADERS = ("Content-Type", "Mcp-Session-Id")
+
+
+class DiskCache:
+    """One JSON file per (tool, arguments) key; expired entries are ignored and overwritten."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tool: str, arguments) -> str:
+        blob = json.dumps({"tool": tool, "arguments": arguments or {}}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        try:
+            with open(os.path.join(self.path, f"{key}.json"), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if time.time() - entry["stored_at"] <= self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return entry["result"]
+        except (OSError, ValueError, KeyError):
+            pass
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, tool: str, arguments, result) -> None:
+        entry = {"stored_at": time.time(), "tool": tool, "arguments": arguments, "result": result}
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, os.path.join(self.path, f"{key}.json"))  # atomic for concurrent readers
+
+
+def parse_sse_messages(body: str) -> list:
+    """JSON payloads of the `data:` events in a text/event-stream body."""
+    messages = []
+    for event in body.replace("\r\n", "\n").split("\n\n"):
+        data = "\n".join(line[5:].lstrip() for line in event.split("\n") if line.startswith("data:"))
+        if data:
+            try:
+                messages.append(json.loads(data))
+            except ValueError:
+                pass
+    return messages
+
+
+def _response_message(content_type: str, body: bytes, request_id):
+    """The JSON-RPC response for request_id in an upstream reply (JSON or SSE)."""
+    text = body.decode("utf-8", errors="replace")
+    if "text/event-stream" in (content_type or ""):
+        candidates = parse_sse_messages(text)
+    else:
+        try:
+            candidates = json.loads(text)
+        except ValueError:
+            return None
+        candidates = candidates if isinstance(candidates, list) else [candidates]
+    for message in candidates:
+        if isinstance(message, dict) and message.get("id") == request_id and ("result" in message or "error" in message):
+            return message
+    return None
+
+
+class CachingProxy:
+    def __init__(self, upstream: str = DEFAULT_UPSTREAM, cache: DiskCache = None, timeout: float = 60.0):
+        self.upstream = upstream
+        self.cache = cache or DiskCache()
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def forward(self, method: str, headers: dict, body: bytes = None):
+        response = self.session.request(method, self.upstream, headers=headers, data=body, timeout=self.timeout)
+        return response.status_code, {k: response.headers[k] for k in RETURN_HEADERS if k in response.headers}, response.content
+
+    def handle_post(self, headers: dict, body: bytes):
+        """Returns (status, headers, body) for one POSTed JSON-RPC message."""
+        try:
+            message = json.loads(body or b"{}")
+        except ValueError:
+            message = None
+        if not isinstance(message, dict) or message.get("method") != "tools/call":
+            return self.forward("POST", headers, body)
+
+        params = message.get("params") or {}
+        tool, arguments = params.get("name"), params.get("arguments") or {}
+        key = self.cache.key(tool, arguments)
+        result = self.cache.get(key)
+        if result is not None:
+            reply = json.dumps({"jsonrpc": "2.0", "id": message.get("id"), "result": result}).encode("utf-8")
+            return 200, {"Content-Type": "application/json", "X-Mcp-Proxy-Cache": "hit"}, reply
+
+        status, out_headers, out_body = self.forward("POST", headers, body)
+        if status == 200:
+            reply = _response_message(out_headers.get("Content-Type"), out_body, message.get("id"))
+            if reply and "result" in reply and not (reply["result"] or {}).get("isError"):
+                self.cache.put(key, tool, arguments, reply["result"])
+        out_headers["X-Mcp-Proxy-Cache"] = "miss"
+        return status, out_headers, out_body
+
+
+def make_handler(proxy: CachingProxy):
+    class ProxyHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _forward_headers(self):
+            return {k: self.headers[k] for k in FORWARD_HEADERS if self.headers.get(k)}
+
+        def _reply(self, status, headers, body):
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            try:
+                self._reply(*proxy.handle_post(self._forward_headers(), body))
+            except requests.RequestException as ex:
+                self._reply(502, {"Content-Type": "text/plain"}, f"Upstream error: {ex}".encode("utf-8"))
+
+        def do_DELETE(self):
+            try:
+                self._reply(*proxy.forward("DELETE", self._forward_headers()))
+            except requests.RequestException as ex:
+                self._reply(502, {"Content-Type": "text/plain"}, f"Upstream error: {ex}".encode("utf-8"))
+
+        def do_GET(self):
+            # No server-initiated stream through the proxy (allowed by the transport spec).
+            self._reply(405, {"Allow": "POST, DELETE"}, b"")
+
+        def log_message(self, fmt, *args):
+            cache = proxy.cache
+            print(f"mcp_proxy {self.address_string()} {fmt % args} (cache hits={cache.hits} misses={cache.misses})")
+
+    return ProxyHandler
+
+
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    """Minimal MCP server with one microsoft_docs_search tool, for offline tests."""
+
+    protocol_version = "HTTP/1.1"
+    calls = 0
+
+    def do_POST(self):
+        message = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        method, request_id = message.get("method"), message.get("id")
+        if request_id is None:  # notification
+            self.send_response(202)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if method == "initialize":
+            result = {
+                "protocolVersion": "2025-03-26",
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "stub-docs", "version": "0.1"},
+            }
+        elif method == "tools/list":
+            result = {"tools": [{
+                "name": "microsoft_docs_search",
+                "description": "Search Microsoft Learn (stub).",
+                "inputSchema": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+            }]}
+        elif method == "tools/call":
+            type(self).calls += 1
+            query = ((message.get("params") or {}).get("arguments") or {}).get("query", "")
+            time.sleep(0.2)  # pretend to be remote
+            result = {"content": [{"type": "text", "text": f"Stub docs for '{query}' (upstream call #{self.calls})"}]}
+        else:
+            result = {}
+        payload = json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result})
+        body = f"event: message\ndata: {payload}\n\n".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Mcp-Session-Id", "stub-session")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching proxy for an MCP (Streamable HTTP) server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL)
+    parser.add_argument("--stub", action="store_true", help="serve the offline stub upstream instead of the proxy")
+    args = parser.parse_args()
+
+    if args.stub:
+        server = ThreadingHTTPServer((args.host, args.port), StubUpstreamHandler)
+        print(f"Stub MCP upstream on http://{args.host}:{args.port}/mcp")
+    else:
+        proxy = CachingProxy(args.upstream, DiskCache(args.cache_dir, args.ttl))
+        server = ThreadingHTTPServer((args.host, args.port), make_handler(proxy))
+        print(f"MCP caching proxy on http://{args.host}:{args.port}/mcp -> {args.upstream} (cache {args.cache_dir}, ttl {args.ttl:.0f}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,7 @@
-import os, time, json
+import os, json, time
 from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
 from openai import AzureOpenAI
 from azure.ai.agents.models import (
-    ListSortOrder,
     McpTool,
     RequiredMcpToolCall,
     RunStepActivityDetails,
@@ -11,9 +9,21 @@ from azure.ai.agents.models import (
     ToolApproval,
 )
 from azure.ai.agents.models import CodeInterpreterTool
+from azure.core.exceptions import ResourceNotFoundError
 import streamlit as st
 from dotenv import load_dotenv
 
+from adf_agent_registry import get_agent_registry
+from adf_auth import get_credential
+from adf_progress import describe_event, emit_event, stream_agent_events
+from adf_history import HistoryStore
+from adf_render import activity_tools, cached_fragment, page_count, page_rows, result_key, tool_call_detail, tool_call_rows
+from adf_run_driver import drive_run
+from adf_metrics import instrument_agent, start_metrics_server
+from adf_tracing import current_span, span, traced
+from adf_timing import Timings, chain_events, waterfall_html
+from adf_session import CONTEXT_MESSAGES, get_or_create_thread, list_recent_messages, session_run_kwargs
+
 # Load environment variables
 load_dotenv()
 
@@ -29,7 +39,7 @@ mcp_server_label = os.environ.get("MCP_SERVER_LABEL", "MicrosoftLearn")
 # Create the project client (Foundry project and credentials)
 project_client = AIProjectClient(
         endpoint=endpoint,
-        credential=DefaultAzureCredential(),
+        credential=get_credential(),
 )
 
 client = AzureOpenAI(
@@ -38,7 +48,9 @@ client = AzureOpenAI(
     api_version="2024-10-21",
 )
 
-def adf_agent(query: str) -> dict:
+@instrument_agent("stadf")
+@traced("adf_agent")
+def adf_agent(query: str, thread_id: str = None, session: bool = False, on_event=None, cancel_event=None) -> dict:
     """Run the agent and return structured info for UI.
 
     Returns dict keys:
@@ -47,7 +59,20 @@ def adf_agent(query: str) -> dict:
       messages: list of {role, content}
       token_usage: dict or None
       status: run final status
+      thread_id: thread used for the run (pass back with session=True to continue it)
+
+    session=True keeps the conversation on thread_id (created if None) with a bounded
+    context window (see adf_session.py); otherwise every call uses a new thread.
+
+    on_event(event) receives live progress (run status, steps, MCP tool calls, assistant
+    text deltas); adf_progress.stream_agent_events wraps this as a generator.
+    Setting cancel_event (threading.Event) cancels the agent run (see adf_run_driver.py).
+
+    The result carries "timings": monotonic spans of each phase and run status (see
+    adf_timing.py), shown as a waterfall in the UIs.
     """
+    timings = Timings()
+    on_event = chain_events(timings.on_run_event, on_event)
     logs = []
     def log(msg):
         logs.append(msg)
@@ -76,7 +101,12 @@ def adf_agent(query: str) -> dict:
         def _ensure_list(v):
             return v if isinstance(v, list) else [v]
         tool_definitions = _ensure_list(mcp_tool.definitions) + _ensure_list(code_interpreter.definitions)
-        agent = agents_client.create_agent(
+        # Reuse a persistent agent per configuration fingerprint (see adf_agent_registry.py)
+        # instead of create_agent/delete_agent on every query.
+        started = time.perf_counter()
+        agent_id = get_agent_registry().get_or_create(
+            agents_client,
+            key="stadf",
             model=os.environ["MODEL_DEPLOYMENT_NAME"],
             name="adf-mcp-agent",
             instructions="""You are a helpful agent that can use MCP tools to assist users. 
@@ -85,39 +115,70 @@ def adf_agent(query: str) -> dict:
             execute using code interpreter tool to execute.""",
             tools=tool_definitions,
             tool_resources=code_interpreter.resources,
+            log=log,
         )
+        timings.add("agent_registry", started, time.perf_counter())
         log(f"Registered {len(tool_definitions)} tool definitions")
-        log(f"Agent: {agent.id} | MCP: {mcp_tool.server_label}")
-        thread = agents_client.threads.create()
-        log(f"Thread: {thread.id}")
-        agents_client.messages.create(thread_id=thread.id, role="user", content=query)
-        run = agents_client.runs.create(thread_id=thread.id, agent_id=agent.id, tool_resources=mcp_tool.resources)
-        log(f"Run: {run.id}")
+        log(f"Agent: {agent_id} | MCP: {mcp_tool.server_label}")
+        run_kwargs = {}
+        if session:
+            with timings.span("session_thread"):
+                thread_id, reused = get_or_create_thread(agents_client, thread_id, log=log)
+            run_kwargs = session_run_kwargs(reused)
+            log(f"Thread: {thread_id} (session, {'reused' if reused else 'new'})")
+        else:
+            with timings.span("threads.create"):
+                thread_id = agents_client.threads.create().id
+            log(f"Thread: {thread_id}")
+        with timings.span("messages.create"):
+            agents_client.messages.create(thread_id=thread_id, role="user", content=query)
+        @traced("agent.requires_action")
+        def handle_required_action(run):
+            """Approve MCP tool calls; anything else -> None (run gets cancelled)."""
+            if not isinstance(run.required_action, SubmitToolApprovalAction):
+                return None
+            tool_calls = run.required_action.submit_tool_approval.tool_calls or []
+            if not tool_calls:
+                log("No tool calls – cancelling run")
+                return None
+            approvals = []
+            for tc in tool_calls:
+                if isinstance(tc, RequiredMcpToolCall):
+                    log(f"Approving tool call {tc.id}")
+                    emit_event(on_event, type="tool_call", name=f"{mcp_tool.server_label}:{getattr(tc, 'name', 'mcp')}",
+                               arguments=getattr(tc, 'arguments', None))
+                    approvals.append(ToolApproval(tool_call_id=tc.id, approve=True, headers=mcp_tool.headers))
+            return {"tool_approvals": approvals} if approvals else None
 
-        while run.status in ["queued", "in_progress", "requires_action"]:
-            time.sleep(0.8)
-            run = agents_client.runs.get(thread_id=thread.id, run_id=run.id)
-            if run.status == "requires_action" and isinstance(run.required_action, SubmitToolApprovalAction):
-                tool_calls = run.required_action.submit_tool_approval.tool_calls or []
-                if not tool_calls:
-                    log("No tool calls – cancelling run")
-                    agents_client.runs.cancel(thread_id=thread.id, run_id=run.id)
-                    break
-                approvals = []
-                for tc in tool_calls:
-                    if isinstance(tc, RequiredMcpToolCall):
-                        log(f"Approving tool call {tc.id}")
-                        approvals.append(ToolApproval(tool_call_id=tc.id, approve=True, headers=mcp_tool.headers))
-                if approvals:
-                    agents_client.runs.submit_tool_outputs(thread_id=thread.id, run_id=run.id, tool_approvals=approvals)
-            log(f"Status: {run.status}")
+        # Event-stream driven run (adaptive polling fallback), see adf_run_driver.py.
+        with timings.span("drive_run"):
+            try:
+                run = drive_run(agents_client, thread_id, agent_id, handle_required_action, log=log,
+                                on_event=on_event, cancel_event=cancel_event, tool_resources=mcp_tool.resources, **run_kwargs)
+            except ResourceNotFoundError:
+                registry = get_agent_registry()
+                if registry.agent_exists(agents_client, agent_id):
+                    # The thread is what's gone (deleted meanwhile): ask again on a new thread.
+                    log(f"Thread {thread_id} not found; retrying on a new thread")
+                    thread_id = agents_client.threads.create().id
+                    agents_client.messages.create(thread_id=thread_id, role="user", content=query)
+                    if session:
+                        run_kwargs = session_run_kwargs(False)
+                else:
+                    # Agent deleted by another process sharing the registry: recreate it once.
+                    log(f"Agent {agent_id} not found; recreating and retrying")
+                    agent_id = registry.recreate(agents_client, "stadf", log=log)
+                run = drive_run(agents_client, thread_id, agent_id, handle_required_action, log=log,
+                                on_event=on_event, cancel_event=cancel_event, tool_resources=mcp_tool.resources, **run_kwargs)
+        timings.finish_run()
 
         status = run.status
         if status == "failed":
             log(f"Run failed: {run.last_error}")
 
-        # Steps (collect structured info including outputs)
-        run_steps = agents_client.run_steps.list(thread_id=thread.id, run_id=run.id)
+        # Steps (collect structured info including outputs); the list pages lazily, so time the whole loop.
+        started = time.perf_counter()
+        run_steps = agents_client.run_steps.list(thread_id=thread_id, run_id=run.id)
         for step in run_steps:
             sid = step.get('id') if isinstance(step, dict) else getattr(step, 'id', None)
             sstatus = step.get('status') if isinstance(step, dict) else getattr(step, 'status', None)
@@ -181,9 +242,12 @@ def adf_agent(query: str) -> dict:
                 "outputs": aggregated_step_outputs,
             })
             log(f"Step {sid} [{sstatus}] with {len(structured_tool_calls)} tool calls and {len(aggregated_step_outputs)} outputs")
+        timings.add("run_steps.list", started, time.perf_counter())
 
         # Messages
-        messages = agents_client.messages.list(thread_id=thread.id, order=ListSortOrder.ASCENDING)
+        # Session threads grow without bound: only fetch the recent window for display.
+        with timings.span("messages.list"):
+            messages = list_recent_messages(agents_client, thread_id, limit=2 * CONTEXT_MESSAGES if session else None)
         for m in messages:
             content = ""
             if m.text_messages:
@@ -200,13 +264,17 @@ def adf_agent(query: str) -> dict:
                 k: getattr(usage, k) for k in ["prompt_tokens", "completion_tokens", "total_tokens"] if hasattr(usage, k)
             } or None
 
-        # Cleanup
-        try:
-            agents_client.delete_agent(agent.id)
-        except Exception:
-            pass
+        # No delete_agent: the agent is kept in the registry and reused by the next query.
 
     summary = final_assistant or "No assistant response."
+    current_span().set_attributes({
+        "adf.answer_source": "agent",
+        "adf.run_status": status,
+        "adf.thread_id": thread_id,
+        "gen_ai.usage.input_tokens": (token_usage or {}).get("prompt_tokens"),
+        "gen_ai.usage.output_tokens": (token_usage or {}).get("completion_tokens"),
+        "gen_ai.usage.total_tokens": (token_usage or {}).get("total_tokens"),
+    })
     details = "\n".join(logs)
     return {
         "summary": summary,
@@ -215,6 +283,8 @@ def adf_agent(query: str) -> dict:
         "steps": steps_list,
         "token_usage": token_usage,
         "status": status,
+        "thread_id": thread_id,
+        "timings": timings.as_dict(),
     }
 
 def _inject_css():
@@ -238,23 +308,40 @@ def _inject_css():
 
 def ui_main():
     st.set_page_config(page_title="ADF Agent", layout="wide")
+    start_metrics_server()  # /metrics for Prometheus when ADF_METRICS_PORT is set (adf_metrics.py)
     _inject_css()
     st.markdown("### Azure Data Factory Agent")
 
+    # Bounded history: latest few results in memory, older ones spilled to disk (adf_history.py).
     if "history" not in st.session_state:
-        st.session_state.history = []
+        st.session_state.history = HistoryStore()
+    if "thread_id" not in st.session_state:
+        st.session_state.thread_id = None
 
     # Optional top bar actions
-    bar_col1, bar_col2 = st.columns([0.8, 0.2])
+    bar_col1, bar_col2, bar_col3 = st.columns([0.35, 0.45, 0.2])
+    with bar_col1:
+        # Session mode: follow-up questions continue the same agent thread (bounded context).
+        session_mode = st.toggle("Keep conversation context", key="session_mode")
     with bar_col2:
+        # Scroll back through earlier answers; spilled ones are rehydrated from disk on selection.
+        summaries = st.session_state.history.summaries()
+        picked = st.selectbox(
+            "Answer", [None] + [h["index"] for h in reversed(summaries)], label_visibility="collapsed",
+            format_func=lambda i: "Latest answer" if i is None else
+            f"#{i + 1} {summaries[i]['query'][:60]} ({summaries[i]['status']})",
+            key=f"history_pick_{len(summaries)}",  # new answer -> new widget -> back to latest
+        )
+    with bar_col3:
         if st.button("Clear History", use_container_width=True):
-            st.session_state.history = []
+            st.session_state.history.clear()
+            st.session_state.thread_id = None
             st.rerun()
 
     container = st.container(height=600)
     with container:
         col1, col2 = st.columns(2, gap="medium")
-        latest = st.session_state.history[-1] if st.session_state.history else None
+        latest = st.session_state.history.get(-1 if picked is None else picked)
 
         with col1:
             st.markdown("**Summary**")
@@ -275,70 +362,76 @@ def ui_main():
             st.markdown("**Details**")
             with st.container(height=534, border=True):
                 if latest:
+                    # Per-phase latency waterfall (adf_timing.py)
+                    with st.expander("Timings", expanded=False):
+                        st.markdown(waterfall_html(latest.get("timings")), unsafe_allow_html=True)
                     with st.expander("Conversation", expanded=False):
                         for m in latest.get("messages", []):
                             role = (m.get('role') or '?').title()
                             content = m.get('content') or ''
                             st.markdown(f"**{role}:** {content}")
+                    # Steps & tool calls: one page of summary rows, a single call's output on demand
+                    # (fragments cached per result, see adf_render.py).
                     with st.expander("Steps & Tool Calls", expanded=True):
-                        for sidx, s in enumerate(latest.get('steps', []), start=1):
-                            step_header = f"Step {s.get('id') or sidx} • {s.get('status')}"
-                            with st.expander(step_header, expanded=False):
-                                # Step outputs
-                                step_outputs = s.get('outputs') or []
-                                if step_outputs:
-                                    with st.expander("Step Outputs", expanded=False):
-                                        for oidx, otext in enumerate(step_outputs, start=1):
-                                            st.code(otext, language="text")
-                                # Tool calls
-                                for tcidx, tc in enumerate(s.get('tool_calls', []) or [], start=1):
-                                    tc_title = f"ToolCall {tcidx}: {tc.get('name') or tc.get('type') or 'tool'}"
-                                    with st.expander(tc_title, expanded=False):
-                                        meta = {k: tc.get(k) for k in ['id','type','name'] if tc.get(k)}
-                                        if meta:
-                                            st.caption("Metadata")
-                                            st.json(meta)
-                                        args_raw = tc.get('arguments')
-                                        if args_raw:
-                                            st.caption("Arguments")
-                                            if isinstance(args_raw, (dict, list)):
-                                                st.json(args_raw)
-                                            else:
-                                                try:
-                                                    st.json(json.loads(args_raw))
-                                                except Exception:
-                                                    st.code(str(args_raw)[:4000])
-                                        out_raw = tc.get('output')
-                                        if out_raw is not None:
-                                            st.caption("Output")
-                                            if isinstance(out_raw, (dict, list)):
-                                                st.json(out_raw)
-                                            else:
-                                                text_out = str(out_raw)
-                                                if len(text_out) > 6000:
-                                                    st.text(text_out[:6000] + '... [truncated]')
-                                                else:
-                                                    st.text(text_out)
-                                        nested = tc.get('nested_outputs') or []
-                                        if nested:
-                                            with st.expander("Nested Outputs", expanded=False):
-                                                for nidx, n in enumerate(nested, start=1):
-                                                    st.code(n if isinstance(n, str) else str(n), language="text")
-                                atools = s.get('activity_tools') or []
-                                if atools:
-                                    with st.expander("Activity Tool Definitions", expanded=False):
-                                        for at in atools:
-                                            params = at.get('parameters') or []
-                                            ptxt = f" (params: {', '.join(params)})" if params else ''
-                                            st.markdown(f"- **{at.get('function')}**: {at.get('description')}{ptxt}")
+                        rows = tool_call_rows(latest)
+                        rkey = result_key(latest)
+                        st.caption(f"{len(latest.get('steps', []))} steps • {len(rows)} tool calls")
+                        if rows:
+                            page = st.number_input("Page", min_value=1, max_value=page_count(latest), value=1,
+                                                   step=1, key=f"details_page_{rkey}")
+                            shown = page_rows(latest, page)
+                            st.dataframe(shown, hide_index=True, use_container_width=True)
+                            choice = st.selectbox("Load tool call", [None] + [r["n"] for r in shown],
+                                                  format_func=lambda n: "—" if n is None else f"#{n}",
+                                                  key=f"details_call_{rkey}_{page}")
+                            if choice is not None:
+                                detail = tool_call_detail(latest, choice)
+                                st.caption(f"Arguments ({detail.get('id')})")
+                                st.code(detail["arguments"] or "(none)", language="json")
+                                st.caption("Output")
+                                st.code(detail["output"] or "(none)", language="json")
+                                for nested in detail["nested_outputs"]:
+                                    st.caption("Nested output")
+                                    st.code(nested, language="text")
+                        atools = activity_tools(latest)
+                        if atools:
+                            st.caption("Activity Tool Definitions")
+                            st.markdown(cached_fragment(latest, "st_activity_tools", lambda: "\n".join(
+                                f"- **{at.get('function')}**: {at.get('description')}"
+                                + (f" (params: {', '.join(at['parameters'])})" if at.get('parameters') else "")
+                                for at in atools
+                            )))
                 else:
                     st.caption("Details will appear here, including steps, tool calls, tool outputs, and full conversation.")
 
     # Chat input fixed at bottom
     user_query = st.chat_input("Ask about Azure Data Factory job status...")
     if user_query:
-        with st.spinner("Running agent...", show_time=True):
-            result = adf_agent(user_query)
+        # Live progress instead of a blind spinner: run status / tool lines in a status box,
+        # assistant text as it streams (see adf_progress.py).
+        result = None
+        # Root span of the query's trace when tracing is on (adf_tracing.py).
+        with span("ui.streamlit.query", **{"adf.session": session_mode}) as ui_span:
+            with st.status("Running agent...", expanded=True) as progress:
+                answer_box = st.empty()
+                answer_text = ""
+                for event in stream_agent_events(adf_agent, user_query, thread_id=st.session_state.thread_id, session=session_mode):
+                    if event["type"] == "text_delta":
+                        answer_text += event["text"]
+                        answer_box.markdown(answer_text)
+                    elif event["type"] == "result":
+                        result = event["result"]
+                    elif event["type"] == "error":
+                        result = {"summary": event["error"], "details": event["error"], "messages": [], "steps": [],
+                                  "token_usage": None, "status": "failed", "thread_id": None}
+                    else:
+                        line = describe_event(event)
+                        if line:
+                            st.write(line)
+                            progress.update(label=line)
+                progress.update(label=f"Run {result.get('status')}", state="error" if result.get("status") == "failed" else "complete")
+            ui_span.set_attribute("adf.run_status", result.get("status"))
+        st.session_state.thread_id = result.get("thread_id") if session_mode else None
         st.session_state.history.append(result)
         st.rerun()
 
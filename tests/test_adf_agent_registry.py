@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+
+import adf_agent_registry
+from adf_agent_registry import AgentRegistry
+
+
+class FakeAgents:
+    """create_agent / get_agent / delete_agent of AgentsClient over an in-memory set of ids."""
+
+    def __init__(self):
+        self.agents = set()
+        self.created = 0
+
+    def create_agent(self, **kwargs):
+        self.created += 1
+        agent_id = f"asst_{self.created}"
+        self.agents.add(agent_id)
+        return SimpleNamespace(id=agent_id)
+
+    def get_agent(self, agent_id):
+        if agent_id not in self.agents:
+            raise ResourceNotFoundError("agent not found")
+        return SimpleNamespace(id=agent_id)
+
+    def delete_agent(self, agent_id):
+        if agent_id not in self.agents:
+            raise ResourceNotFoundError("agent not found")
+        self.agents.remove(agent_id)
+
+
+@pytest.fixture
+def agents():
+    return FakeAgents()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "registry.json")
+
+
+def _get(registry, agents, instructions="v1", key="stadfops"):
+    return registry.get_or_create(agents, key, model="gpt", name="adf", instructions=instructions, tools=[],
+                                  log=lambda *_: None)
+
+
+def test_same_configuration_reuses_one_agent_across_processes(agents, path):
+    first = _get(AgentRegistry(path), agents)
+    assert _get(AgentRegistry(path), agents) == first
+    assert agents.created == 1
+
+
+def test_superseded_agent_is_kept_then_retired(agents, path, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(adf_agent_registry.time, "time", lambda: clock.now)
+    old = _get(AgentRegistry(path, retire_after=3600), agents, "v1")
+    new = _get(AgentRegistry(path, retire_after=3600), agents, "v2")
+    assert old != new and agents.agents == {old, new}  # an old-config process may still use it
+    assert _get(AgentRegistry(path, retire_after=3600), agents, "v1") == old
+    clock.now += 3600
+    assert _get(AgentRegistry(path, retire_after=3600), agents, "v2") == new
+    assert agents.agents == {new}
+    with open(path, encoding="utf-8") as fh:
+        assert [e["agent_id"] for e in json.load(fh).values()] == [new]
+
+
+def test_recreate_after_the_agent_was_deleted(agents, path):
+    registry = AgentRegistry(path)
+    agent_id = _get(registry, agents)
+    agents.delete_agent(agent_id)
+    assert not registry.agent_exists(agents, agent_id)
+    new_id = registry.recreate(agents, "stadfops", log=lambda *_: None)
+    assert new_id != agent_id and registry.agent_exists(agents, new_id)
+    assert _get(registry, agents) == new_id
+
+
+def test_old_key_based_file_is_read(agents, path):
+    registry = AgentRegistry(path)
+    agent_id = _get(registry, agents)
+    fingerprint = next(iter(registry._entries))
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"stadfops": {"fingerprint": fingerprint, "agent_id": agent_id, "created_at": 1.0}}, fh)
+    assert _get(AgentRegistry(path), agents) == agent_id
+    assert agents.created == 1
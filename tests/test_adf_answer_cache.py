@@ -0,0 +1,31 @@
+import json
+
+from adf_answer_cache import AnswerCache
+
+
+def _runs(status):
+    return json.dumps([{"runId": "r1", "pipelineName": "etl", "status": status}])
+
+
+def test_answer_without_lookups_is_not_cached():
+    cache = AnswerCache()
+    assert cache.put("how do I rerun a pipeline?", [], {"response": "See the docs."}) is False
+    assert cache.get("how do I rerun a pipeline?", {}, log=lambda *_: None) is None
+
+
+def test_hit_while_status_unchanged_then_stale():
+    cache = AnswerCache()
+    state = {"status": "Succeeded"}
+    dispatch = {"adf_pipeline_runs": lambda args: _runs(state["status"])}
+    args = {"pipelinename": "etl"}
+    assert cache.put("Did etl fail?", [("adf_pipeline_runs", args, _runs("Succeeded"))], {"response": "No."})
+    assert cache.get("did etl fail", dispatch, log=lambda *_: None)["response"] == "No."
+    state["status"] = "Failed"
+    assert cache.get("did etl fail", dispatch, log=lambda *_: None) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_error_output_is_not_cached():
+    cache = AnswerCache()
+    outputs = [("adf_pipeline_runs", {"pipelinename": "etl"}, "Error: ARM throttled the request")]
+    assert cache.put("did etl fail", outputs, {"response": "Unknown."}) is False
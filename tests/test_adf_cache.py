@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+
+import adf_cache
+from adf_cache import RunCache, SingleFlight
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(adf_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_hit_and_miss_counters():
+    cache = RunCache()
+    assert cache.get("k") is None
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 1, "hit_ratio": 0.5}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RunCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a is now the most recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = RunCache()
+    cache.put("k", "v", ttl=10)
+    clock.now += 9.9
+    assert cache.get("k") == "v"
+    clock.now += 0.2
+    assert cache.get("k") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_entry_without_ttl_never_expires(clock):
+    cache = RunCache()
+    cache.put("k", "v")
+    clock.now += 10 ** 9
+    assert cache.get("k") == "v"
+
+
+def test_ttls_follow_run_status():
+    cache = RunCache(active_ttl=10, latest_ttl=60)
+    assert cache.latest_run_ttl("Succeeded") == 60
+    assert cache.latest_run_ttl("InProgress") == 10
+    assert cache.activity_runs_ttl("unknown-run") == 10
+    cache.note_run_status("r1", "InProgress")
+    assert cache.activity_runs_ttl("r1") == 10
+    cache.note_run_status("r1", "Failed")
+    assert cache.activity_runs_ttl("r1") is None  # terminal: activities never change
+
+
+def test_latest_run_id_is_per_status_filter():
+    cache = RunCache()
+    cache.note_latest_run("etl", "", "r2")
+    cache.note_latest_run("etl", "Failed", "r1")
+    assert cache.latest_run_id("etl") == "r2"
+    assert cache.latest_run_id("etl", "Failed") == "r1"
+    cache.clear()
+    assert cache.latest_run_id("etl") is None
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.005)
+
+
+def _start_followers(flight, key, fn, n):
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    threads, results, errors = _start_followers(flight, "k", fetch, 5)
+    _wait_for(lambda: flight.stats()["coalesced"] == 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    assert errors == []
+    assert len(results) == 5 and all(r is results[0] for r in results)  # one shared object
+    assert flight.stats() == {"requests": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_single_flight_shares_errors_then_forgets_the_key():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("throttled")
+
+    threads, results, errors = _start_followers(flight, "k", failing, 3)
+    _wait_for(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == [] and len(errors) == 3
+    assert all(str(e) == "throttled" for e in errors)
+    # A failed call is not remembered: the next caller runs fn again.
+    assert flight.do("k", lambda: "ok") == "ok"
+    assert flight.stats()["requests"] == 2
+
+
+def test_single_flight_does_not_coalesce_different_keys():
+    flight = SingleFlight()
+    release = threading.Event()
+    started = []
+
+    def fetch(key):
+        def run():
+            started.append(key)
+            release.wait(5)
+            return key
+        return run
+
+    threads = [threading.Thread(target=flight.do, args=(k, fetch(k))) for k in ("a", "b")]
+    for t in threads:
+        t.start()
+    _wait_for(lambda: len(started) == 2)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert flight.stats()["coalesced"] == 0
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from adf_serving import FairScheduler, QueueFull
+
+
+def test_grants_up_to_slots_then_queues():
+    sched = FairScheduler(slots=2, per_user=2, max_waiting=8)
+    a1, a2, a3 = (sched.enqueue("a") for _ in range(3))
+    assert (a1.granted, a2.granted, a3.granted) == (True, True, False)
+    assert sched.position(a3) == 1
+    assert sched.stats() == {"running": 2, "waiting": 1, "slots": 2}
+    sched.release(a1)
+    assert a3.granted
+    assert sched.position(a3) == 0
+
+
+def test_per_user_limit_lets_other_sessions_through():
+    sched = FairScheduler(slots=4, per_user=1, max_waiting=8)
+    a1, a2 = sched.enqueue("a"), sched.enqueue("a")
+    b1 = sched.enqueue("b")
+    assert a1.granted and not a2.granted and b1.granted
+
+
+def test_round_robin_order_between_sessions():
+    sched = FairScheduler(slots=1, per_user=1, max_waiting=8)
+    running = sched.enqueue("a")
+    a2, a3 = sched.enqueue("a"), sched.enqueue("a")
+    b1 = sched.enqueue("b")
+    c1 = sched.enqueue("c")
+    # A burst from session a does not push b and c back.
+    assert [sched.position(t) for t in (b1, c1, a2, a3)] == [1, 2, 3, 4]
+
+    granted = []
+    for _ in range(4):
+        current = running
+        sched.release(current)
+        running = next(t for t in (a2, a3, b1, c1) if t.granted and t not in granted)
+        granted.append(running)
+    assert granted == [b1, c1, a2, a3]
+
+
+def test_least_recently_served_session_wins_a_tie():
+    sched = FairScheduler(slots=1, per_user=1, max_waiting=8)
+    a1 = sched.enqueue("a")
+    a2 = sched.enqueue("a")
+    b1 = sched.enqueue("b")
+    sched.release(a1)
+    # a2 and b1 are both their session's next request; b was served less recently.
+    assert b1.granted and not a2.granted
+
+
+def test_queue_full():
+    sched = FairScheduler(slots=1, per_user=1, max_waiting=2)
+    sched.enqueue("a")
+    sched.enqueue("b")
+    sched.enqueue("c")
+    with pytest.raises(QueueFull):
+        sched.enqueue("d")
+
+
+def test_release_of_waiting_ticket_abandons_it():
+    sched = FairScheduler(slots=1, per_user=1, max_waiting=8)
+    a1 = sched.enqueue("a")
+    b1 = sched.enqueue("b")
+    c1 = sched.enqueue("c")
+    sched.release(b1)
+    assert sched.position(c1) == 1
+    sched.release(a1)
+    assert c1.granted and not b1.granted
+
+
+def test_wait_returns_when_granted_and_cancel_session_wakes_waiters():
+    sched = FairScheduler(slots=1, per_user=1, max_waiting=8)
+    a1 = sched.enqueue("a")
+    b1 = sched.enqueue("b")
+    assert sched.wait(b1, timeout=0.01) is False
+
+    threading.Timer(0.05, sched.release, args=(a1,)).start()
+    assert sched.wait(b1, timeout=5) is True
+
+    c1 = sched.enqueue("c")
+    threading.Timer(0.05, sched.cancel_session, args=("c",)).start()
+    assert sched.wait(c1, timeout=5) is False
+    assert c1.cancel.is_set()
+    assert sched.cancel_session("b") == 1  # the running ticket is flagged too
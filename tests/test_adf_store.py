@@ -0,0 +1,126 @@
+import datetime
+
+import pytest
+
+from adf_queries import iter_activity_runs, run_window
+from adf_rest import AdfRestError
+from adf_store import RunStore, WATERMARK_OVERLAP
+
+TS = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def run(run_id, pipeline, status, start, updated=None):
+    return {"runId": run_id, "pipelineName": pipeline, "status": status, "runStart": start,
+            "lastUpdated": updated or start}
+
+
+class FakeClient:
+    """post_json of AdfRestClient: serves queued responses (a list of pages each) and records the bodies."""
+
+    def __init__(self):
+        self.responses = []
+        self.bodies = []
+
+    def post_json(self, path, body):
+        self.bodies.append(dict(body))
+        response = self.responses[0]
+        if isinstance(response, Exception):
+            self.responses.pop(0)
+            raise response
+        page = response.pop(0)
+        if not response:
+            self.responses.pop(0)
+        return page
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def store(tmp_path, client):
+    return RunStore(str(tmp_path / "runs.db"), client=client, backfill_hours=48)
+
+
+def _ts(value):
+    return datetime.datetime.strptime(value, TS)
+
+
+def test_first_sync_backfills_and_follows_continuation(store, client):
+    client.responses.append([
+        {"value": [run("r1", "etl", "Succeeded", "2024-01-01T00:00:00Z")], "continuationToken": "t1"},
+        {"value": [run("r2", "etl", "InProgress", "2024-01-01T01:00:00Z")]},
+    ])
+    assert store.sync() == 2
+    first = client.bodies[0]
+    span = _ts(first["lastUpdatedBefore"]) - _ts(first["lastUpdatedAfter"])
+    assert abs(span - datetime.timedelta(hours=48)) <= datetime.timedelta(seconds=1)
+    assert client.bodies[1]["continuationToken"] == "t1"
+    assert store.latest_run("etl")["runId"] == "r2"
+    assert store.stats()["watermark"] == first["lastUpdatedBefore"]
+
+
+def test_incremental_sync_starts_at_watermark_minus_overlap_and_upserts(store, client):
+    client.responses.append([{"value": [run("r1", "etl", "InProgress", "2024-01-01T00:00:00Z")]}])
+    store.sync()
+    watermark = store.stats()["watermark"]
+
+    client.responses.append([{"value": [run("r1", "etl", "Succeeded", "2024-01-01T00:00:00Z", "2024-01-01T00:30:00Z")]}])
+    assert store.sync() == 1
+    assert _ts(client.bodies[-1]["lastUpdatedAfter"]) == _ts(watermark) - WATERMARK_OVERLAP
+    assert store.stats()["pipeline_runs"] == 1  # updated in place, not duplicated
+    assert store.latest_run("etl")["status"] == "Succeeded"
+    assert store.run_status("r1") == "Succeeded"
+
+
+def test_failed_sync_keeps_the_watermark(store, client):
+    client.responses.append([{"value": [run("r1", "etl", "Succeeded", "2024-01-01T00:00:00Z")]}])
+    store.sync()
+    watermark = store.stats()["watermark"]
+    client.responses.append(AdfRestError(429, "throttled"))
+    with pytest.raises(AdfRestError):
+        store.sync()
+    assert store.stats()["watermark"] == watermark
+
+
+def test_ensure_fresh_syncs_only_when_stale(store, client):
+    client.responses.append([{"value": []}])
+    assert store.ensure_fresh() is True  # never synced: syncs inline
+    assert len(client.bodies) == 1
+    assert store.ensure_fresh() is True  # within max_lag: no ARM call
+    assert len(client.bodies) == 1
+    client.responses.append(AdfRestError(500, "boom"))
+    assert store.ensure_fresh(max_lag=0) is False
+    assert "boom" in store.last_sync_error
+
+
+def test_latest_run_filters_by_status_and_orders_by_start(store, client):
+    client.responses.append([{"value": [
+        run("r1", "etl", "Failed", "2024-01-01T00:00:00Z"),
+        run("r2", "etl", "Succeeded", "2024-01-02T00:00:00Z"),
+        run("r3", "other", "Succeeded", "2024-01-03T00:00:00Z"),
+    ]}])
+    store.sync()
+    assert store.latest_run("etl")["runId"] == "r2"
+    assert store.latest_run("etl", "Failed")["runId"] == "r1"
+    assert store.latest_run("missing") is None
+    assert [r["runId"] for r in store.latest_runs()] == ["r2", "r3"]
+
+
+def test_activities_of_a_run_older_than_48h(store, client):
+    old = dict(run("old", "etl", "Succeeded", "2024-01-01T00:00:00Z", "2024-01-01T02:00:00Z"),
+               runEnd="2024-01-01T02:00:00Z")
+    client.responses.append([{"value": [old]}])
+    store.sync()
+    window = run_window(store.run("old"))
+    assert window == {"lastUpdatedAfter": "2023-12-31T23:00:00Z", "lastUpdatedBefore": "2024-01-01T03:00:00Z"}
+    client.responses.append([{"value": [{"activityName": "Copy", "status": "Succeeded"}]}])
+    records = list(iter_activity_runs("old", window=window, client=client))
+    assert client.bodies[-1]["lastUpdatedAfter"] == "2023-12-31T23:00:00Z"
+    assert records == [{"activityName": "Copy", "status": "Succeeded"}]
+    # An empty fetch (a window that missed the run) is never served as the run's activities.
+    store.put_activity_runs("old", [])
+    assert store.activity_runs("old") is None
+    store.put_activity_runs("old", records)
+    assert store.activity_runs("old") == records
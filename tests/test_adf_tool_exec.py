@@ -0,0 +1,33 @@
+import threading
+
+from adf_tool_exec import run_tool_calls
+
+
+def test_known_and_unknown_calls_keep_call_order():
+    dispatch = {"runs": lambda args: f"runs of {args['name']}"}
+    calls = [("a", "runs", {"name": "etl"}), ("b", "nope", {}), ("c", "runs", {"name": "load"})]
+    assert run_tool_calls(calls, dispatch, log=lambda *_: None) == [
+        ("a", "runs of etl"), ("b", None), ("c", "runs of load")]
+
+
+def test_failing_call_is_reported_without_failing_the_others():
+    def boom(args):
+        raise RuntimeError("throttled")
+
+    dispatch = {"ok": lambda args: "fine", "boom": boom}
+    results = run_tool_calls([("a", "boom", {}), ("b", "ok", {})], dispatch, log=lambda *_: None)
+    assert results == [("a", "Tool boom failed: throttled"), ("b", "fine")]
+
+
+def test_slow_call_times_out():
+    release = threading.Event()
+
+    def slow(args):
+        release.wait(5)
+        return "late"
+
+    try:
+        results = run_tool_calls([("a", "slow", {})], {"slow": slow}, timeout=0.05, log=lambda *_: None)
+    finally:
+        release.set()
+    assert results == [("a", "Tool slow timed out after 0s; data not available.")]
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import mcp_proxy
+from mcp_proxy import CachingProxy, DiskCache, StubUpstreamHandler, make_handler, parse_sse_messages
+
+HEADERS = {"Content-Type": "application/json", "Accept": "application/json, text/event-stream"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mcp_proxy, "time", SimpleNamespace(time=clock, sleep=lambda s: None))
+    return clock
+
+
+@pytest.fixture
+def stub():
+    handler = type("Stub", (StubUpstreamHandler,), {"calls": 0})  # per-test call counter
+    server = _serve(handler)
+    yield handler, f"http://127.0.0.1:{server.server_address[1]}/mcp"
+    server.shutdown()
+
+
+@pytest.fixture
+def proxy_url(stub, tmp_path, clock):
+    proxy = CachingProxy(stub[1], DiskCache(str(tmp_path), ttl=60))
+    server = _serve(make_handler(proxy))
+    yield f"http://127.0.0.1:{server.server_address[1]}/mcp"
+    server.shutdown()
+
+
+def _call(url, query, request_id=1):
+    message = {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+               "params": {"name": "microsoft_docs_search", "arguments": {"query": query}}}
+    return requests.post(url, data=json.dumps(message), headers=HEADERS, timeout=10)
+
+
+def _result_text(response):
+    if "text/event-stream" in response.headers.get("Content-Type", ""):
+        message = parse_sse_messages(response.text)[0]
+    else:
+        message = response.json()
+    return message["result"]["content"][0]["text"]
+
+
+def test_miss_then_hit(stub, proxy_url):
+    handler, _ = stub
+    first = _call(proxy_url, "queryPipelineRuns")
+    assert first.status_code == 200
+    assert first.headers["X-Mcp-Proxy-Cache"] == "miss"
+    assert handler.calls == 1
+
+    second = _call(proxy_url, "queryPipelineRuns", request_id=7)
+    assert second.headers["X-Mcp-Proxy-Cache"] == "hit"
+    assert second.json()["id"] == 7  # cached result answered under the new request id
+    assert _result_text(second) == _result_text(first)
+    assert handler.calls == 1
+
+
+def test_different_arguments_are_separate_entries(stub, proxy_url):
+    handler, _ = stub
+    _call(proxy_url, "queryPipelineRuns")
+    assert _call(proxy_url, "queryActivityRuns").headers["X-Mcp-Proxy-Cache"] == "miss"
+    assert handler.calls == 2
+
+
+def test_entry_expires_after_ttl(stub, proxy_url, clock):
+    handler, _ = stub
+    _call(proxy_url, "queryPipelineRuns")
+    clock.now += 59
+    assert _call(proxy_url, "queryPipelineRuns").headers["X-Mcp-Proxy-Cache"] == "hit"
+    clock.now += 2
+    expired = _call(proxy_url, "queryPipelineRuns")
+    assert expired.headers["X-Mcp-Proxy-Cache"] == "miss"
+    assert handler.calls == 2
+
+
+def test_notifications_and_other_methods_pass_through(stub, proxy_url):
+    handler, _ = stub
+    notification = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+    response = requests.post(proxy_url, data=json.dumps(notification), headers=HEADERS, timeout=10)
+    assert response.status_code == 202
+    assert "X-Mcp-Proxy-Cache" not in response.headers
+
+    init = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}}
+    response = requests.post(proxy_url, data=json.dumps(init), headers=HEADERS, timeout=10)
+    assert response.status_code == 200
+    assert response.headers["Mcp-Session-Id"] == "stub-session"
+    assert parse_sse_messages(response.text)[0]["result"]["serverInfo"]["name"] == "stub-docs"
+    assert handler.calls == 0
+
+
+def test_error_results_are_not_cached(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    proxy = CachingProxy("http://upstream.invalid/mcp", cache)
+    error_reply = json.dumps({"jsonrpc": "2.0", "id": 1, "result": {"isError": True, "content": []}}).encode()
+    proxy.forward = lambda method, headers, body=None: (200, {"Content-Type": "application/json"}, error_reply)
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                       "params": {"name": "microsoft_docs_search", "arguments": {"query": "x"}}}).encode()
+    proxy.handle_post({}, body)
+    assert cache.get(cache.key("microsoft_docs_search", {"query": "x"})) is None